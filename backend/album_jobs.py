@@ -0,0 +1,433 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from langchain_openai import ChatOpenAI
+from qdrant_client import QdrantClient
+
+from crew import FamilyBookCrew
+from db import generate_album_with_presigned_urls, generate_albums_with_presigned_urls
+from tools import search_images, search_themes
+from utils.job_manager import append_event, create_job, update_job
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+ALBUM_GENERATION_WORKERS = int(os.getenv("ALBUM_GENERATION_WORKERS", 2))
+ALBUM_QUEUE_MAX_DEPTH = int(os.getenv("ALBUM_QUEUE_MAX_DEPTH", 50))
+
+# "fast" searches Qdrant directly and only asks the LLM for a name,
+# "agent" hands the whole album to the CrewAI album_creation_agent
+ALBUM_MODE = os.getenv("ALBUM_MODE", "agent")
+ALBUM_MAX_IMAGES = 10
+ALBUM_NAMING_MODEL = os.getenv("ALBUM_NAMING_MODEL", "gpt-4-turbo-preview")
+
+ALBUM_NAMING_PROMPT = """You name family photo albums.
+{context}
+Reply with a JSON object with exactly two keys:
+"album_name": an album name of at most 7 words,
+"description": a description of the album of at most 50 words."""
+
+# Define CrewOutput as a type alias for what crew.kickoff() might return
+CrewResult = Union[str, Dict[str, Any]]
+
+
+def parse_string_to_dict(s: str) -> dict:
+    """Parse a string that looks like a dictionary into an actual dictionary."""
+    try:
+        # First, try to parse it as JSON
+        return json.loads(s)
+    except json.JSONDecodeError:
+        # If JSON parsing fails, use custom parsing method
+        s = s.strip().strip("{}")
+        pairs = [pair.split(":", 1) for pair in s.split('",')]
+        result = {}
+        for key, value in pairs:
+            key = key.strip().strip('"')
+            value = value.strip().strip('"')
+            if value.startswith("[") and value.endswith("]"):
+                value = [v.strip().strip('"') for v in value[1:-1].split(",")]
+            result[key] = value
+        return result
+
+def parse_crew_result(result: CrewResult) -> Dict[str, Any]:
+    """Parse and validate the crew result into a consistent format."""
+    logger.debug(f"Parsing crew result of type: {type(result)}")
+    logger.debug(f"Raw result: {result!r}")
+
+    if isinstance(result, str):
+        try:
+            album_data = json.loads(result)
+        except json.JSONDecodeError:
+            album_data = parse_string_to_dict(result)
+    elif isinstance(result, dict):
+        album_data = result
+    else:
+        raise ValueError(f"Unexpected result format from album generation: {result}")
+
+    # Validate required keys
+    required_keys = ["album_name", "description", "image_ids"]
+    if not all(key in album_data for key in required_keys):
+        missing_keys = [key for key in required_keys if key not in album_data]
+        raise ValueError(f"Invalid album data format: missing keys {missing_keys}")
+
+    return album_data
+
+
+_naming_llm: Optional[ChatOpenAI] = None
+
+
+def get_naming_llm() -> ChatOpenAI:
+    """Build the naming client on first use, so importing needs no OpenAI key."""
+    global _naming_llm
+    if _naming_llm is None:
+        _naming_llm = ChatOpenAI(
+            model=ALBUM_NAMING_MODEL,
+            temperature=0.7,
+            max_tokens=150,
+            model_kwargs={"response_format": {"type": "json_object"}},
+        )
+    return _naming_llm
+
+
+async def name_album(
+    theme: Optional[str] = None, filenames: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """
+    Ask the LLM for an album_name and description in one JSON-mode completion.
+
+    Falls back to a name derived from the theme if the call fails or returns
+    something unusable, so a naming problem never loses the selected images.
+    """
+    if theme:
+        context = f'The album was created for the request: "{theme}".'
+    else:
+        hints = ", ".join(name for name in (filenames or []) if name) or "unknown"
+        context = (
+            "The album groups photos similar to one uploaded photo. "
+            f"Their file names are: {hints}."
+        )
+    try:
+        response = await get_naming_llm().ainvoke(ALBUM_NAMING_PROMPT.format(context=context))
+        naming = json.loads(response.content)
+        return {
+            "album_name": str(naming["album_name"]),
+            "description": str(naming["description"]),
+        }
+    except Exception as e:
+        logger.warning(f"Album naming failed, using a fallback name: {str(e)}")
+        return {
+            "album_name": " ".join((theme or "Similar photos").split()[:7]).title(),
+            "description": theme or "Photos similar to the uploaded image.",
+        }
+
+
+def select_album_images(
+    hits_per_theme: List[List[Dict[str, Any]]], images_per_album: int, dedupe: bool
+) -> List[List[str]]:
+    """
+    Pick up to images_per_album image IDs per theme from ranked search hits.
+
+    With dedupe every photo goes to the theme it matches best: all hits are
+    visited from the highest score down and a photo is only taken by the
+    first theme that still has room for it.
+    """
+    if not dedupe:
+        return [
+            [hit["image_id"] for hit in hits[:images_per_album]]
+            for hits in hits_per_theme
+        ]
+
+    selected: List[List[str]] = [[] for _ in hits_per_theme]
+    assigned = set()
+    ranked = sorted(
+        (
+            (hit["score"], position, hit["image_id"])
+            for position, hits in enumerate(hits_per_theme)
+            for hit in hits
+        ),
+        reverse=True,
+    )
+    for _, position, image_id in ranked:
+        if image_id in assigned or len(selected[position]) >= images_per_album:
+            continue
+        selected[position].append(image_id)
+        assigned.add(image_id)
+    return selected
+
+
+async def timed(timings: Dict[str, float], name: str, awaitable: Awaitable[Any]) -> Any:
+    """Await awaitable and record how long it took as timings[f"{name}_seconds"]."""
+    start = time.perf_counter()
+    result = await awaitable
+    timings[f"{name}_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class AlbumQueueFull(Exception):
+    pass
+
+
+class AlbumGenerationQueue:
+    """
+    Queue of album generations run on a bounded thread pool.
+
+    In "agent" mode the CrewAI crew picks and names the album; crew.kickoff()
+    is synchronous (LLM calls, CLIP inference), so each of the
+    ALBUM_GENERATION_WORKERS workers hands it to a dedicated executor and the
+    event loop stays free. "fast" mode runs the vector search on the same
+    executor and makes a single naming completion, and batch jobs build one
+    album per theme from a single search_batch request. At most
+    ALBUM_QUEUE_MAX_DEPTH requests wait at once.
+    Job state (QUEUED -> RUNNING -> COMPLETED, or FAILED), the saved album ID
+    and timings are recorded through utils.job_manager.
+    """
+
+    def __init__(
+        self,
+        qdrant_client: QdrantClient,
+        workers: int = ALBUM_GENERATION_WORKERS,
+        max_depth: int = ALBUM_QUEUE_MAX_DEPTH,
+    ):
+        self.qdrant_client = qdrant_client
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_depth)
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="album-crew"
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        logger.info(f"Started album generation queue with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _enqueue(
+        self,
+        generate: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+        **details,
+    ) -> str:
+        if self._queue.full():
+            raise AlbumQueueFull("Too many album generations queued, try again later")
+
+        job_id = f"album-{uuid.uuid4()}"
+        await asyncio.to_thread(
+            create_job, job_id, "QUEUED", queue_depth=self.depth(), **details
+        )
+        try:
+            self._queue.put_nowait((job_id, generate, time.perf_counter()))
+        except asyncio.QueueFull:
+            # Another request took the last slot while the job was being created
+            await asyncio.to_thread(
+                update_job, job_id, status="FAILED", result="Album queue full"
+            )
+            raise AlbumQueueFull("Too many album generations queued, try again later")
+        return job_id
+
+    async def submit(
+        self,
+        theme: Optional[str] = None,
+        uploaded_image_path: Optional[str] = None,
+        mode: str = ALBUM_MODE,
+    ) -> str:
+        """
+        Queue an album generation and return its job ID.
+
+        :raises AlbumQueueFull: if ALBUM_QUEUE_MAX_DEPTH requests are already waiting
+        """
+        generate = self._generate_fast if mode == "fast" else self._generate
+
+        async def generate_one(job_id: str) -> List[Dict[str, Any]]:
+            return [await generate(job_id, theme, uploaded_image_path)]
+
+        return await self._enqueue(
+            generate_one, theme=theme, uploaded_image_path=uploaded_image_path, mode=mode
+        )
+
+    async def submit_batch(
+        self,
+        themes: List[str],
+        dedupe: bool = True,
+        images_per_album: int = ALBUM_MAX_IMAGES,
+    ) -> str:
+        """
+        Queue one album per theme as a single job and return its job ID.
+
+        :raises AlbumQueueFull: if ALBUM_QUEUE_MAX_DEPTH requests are already waiting
+        """
+        generate = functools.partial(
+            self._generate_batch,
+            themes=themes,
+            dedupe=dedupe,
+            images_per_album=images_per_album,
+        )
+        return await self._enqueue(generate, themes=themes, dedupe=dedupe, mode="batch")
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _generate_fast(
+        self, job_id: str, theme: Optional[str], uploaded_image_path: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Pick the top ALBUM_MAX_IMAGES search hits in code and name the album with a
+        single LLM call. As in agent mode, an uploaded image takes precedence
+        over the theme; for a theme the naming call runs alongside the search.
+        """
+        loop = asyncio.get_running_loop()
+        timings: Dict[str, float] = {}
+
+        search = timed(
+            timings,
+            "search",
+            loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    search_images,
+                    self.qdrant_client,
+                    text_queries=None if uploaded_image_path else [theme],
+                    uploaded_image_path=uploaded_image_path,
+                    limit=ALBUM_MAX_IMAGES,
+                ),
+            ),
+        )
+        if not uploaded_image_path:
+            hits, naming = await asyncio.gather(
+                search, timed(timings, "naming", name_album(theme=theme))
+            )
+        else:
+            hits = await search
+            naming = await timed(
+                timings,
+                "naming",
+                name_album(filenames=[hit["filename"] for hit in hits]),
+            )
+
+        await asyncio.to_thread(append_event, job_id, f"Selected {len(hits)} images")
+        await asyncio.to_thread(update_job, job_id, **timings)
+        album_data = {**naming, "image_ids": [hit["image_id"] for hit in hits]}
+        return await generate_album_with_presigned_urls(album_data)
+
+    async def _generate_batch(
+        self, job_id: str, themes: List[str], dedupe: bool, images_per_album: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Build one album per theme from a single CLIP text pass and one Qdrant
+        search_batch request, naming all albums concurrently, and save them
+        with one bulk write. Themes that match no photos produce no album.
+        """
+        loop = asyncio.get_running_loop()
+        timings: Dict[str, float] = {}
+
+        # With de-duplication a theme may lose photos to a better-matching
+        # theme, so fetch extra candidates to refill from
+        candidates = images_per_album * (3 if dedupe else 1)
+        hits_per_theme, namings = await asyncio.gather(
+            timed(
+                timings,
+                "search",
+                loop.run_in_executor(
+                    self._executor,
+                    functools.partial(
+                        search_themes, self.qdrant_client, themes, limit=candidates
+                    ),
+                ),
+            ),
+            timed(
+                timings,
+                "naming",
+                asyncio.gather(*(name_album(theme=theme) for theme in themes)),
+            ),
+        )
+        selected = select_album_images(hits_per_theme, images_per_album, dedupe)
+
+        albums_data = [
+            {**naming, "image_ids": image_ids}
+            for naming, image_ids in zip(namings, selected)
+            if image_ids
+        ]
+        await asyncio.to_thread(
+            append_event,
+            job_id,
+            f"Selected photos for {len(albums_data)} of {len(themes)} themes",
+        )
+        await asyncio.to_thread(update_job, job_id, **timings)
+        return await generate_albums_with_presigned_urls(albums_data)
+
+    async def _generate(
+        self, job_id: str, theme: Optional[str], uploaded_image_path: Optional[str]
+    ) -> Dict[str, Any]:
+        crew = FamilyBookCrew(job_id, self.qdrant_client)
+        if uploaded_image_path:
+            logger.info(f"Processing image-based album generation: {uploaded_image_path}")
+            crew.setup_crew(uploaded_image_path=uploaded_image_path)
+        else:
+            logger.info(f"Processing theme-based album generation: {theme}")
+            crew.setup_crew(theme_input=theme)
+
+        loop = asyncio.get_running_loop()
+        crew_start = time.perf_counter()
+        result = await loop.run_in_executor(self._executor, crew.kickoff)
+        await asyncio.to_thread(
+            update_job, job_id, crew_seconds=round(time.perf_counter() - crew_start, 3)
+        )
+
+        album_data = parse_crew_result(result)
+        return await generate_album_with_presigned_urls(album_data)
+
+    async def _worker(self):
+        while True:
+            job_id, generate, queued_at = await self._queue.get()
+            started_at = time.perf_counter()
+            await asyncio.to_thread(
+                update_job,
+                job_id,
+                status="RUNNING",
+                queued_seconds=round(started_at - queued_at, 3),
+            )
+            try:
+                albums = await generate(job_id)
+                album_ids = [album["id"] for album in albums]
+                await asyncio.to_thread(
+                    update_job,
+                    job_id,
+                    status="COMPLETED",
+                    result=",".join(album_ids),
+                    album_id=album_ids[0] if album_ids else None,
+                    album_ids=album_ids,
+                    total_seconds=round(time.perf_counter() - started_at, 3),
+                )
+            except asyncio.CancelledError:
+                await asyncio.to_thread(
+                    update_job, job_id, status="FAILED", result="Album generation cancelled"
+                )
+                raise
+            except Exception as e:
+                logger.error(f"Error generating album for job {job_id}: {str(e)}", exc_info=True)
+                await asyncio.to_thread(
+                    update_job,
+                    job_id,
+                    status="FAILED",
+                    result=str(e),
+                    total_seconds=round(time.perf_counter() - started_at, 3),
+                )
+            finally:
+                self._queue.task_done()
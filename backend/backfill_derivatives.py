@@ -0,0 +1,108 @@
+"""
+Generate thumbnail and medium derivatives for photos uploaded before ingest created them.
+
+Usage:
+    python backfill_derivatives.py [--batch-size 32] [--concurrency 8]
+
+Only image documents without metadata.derivatives are processed, so the command
+can be stopped and re-run at any time and will continue with what is left.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from db import (
+    close_clients,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_collection,
+    read_s3_object,
+    run_in_s3_executor,
+)
+from ingest import build_derivatives, decode_images, upload_derivatives
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def derive(data) -> Optional[Dict[str, bytes]]:
+    image = decode_images([data])[0]
+    return build_derivatives(image) if image is not None else None
+
+
+async def backfill_photo(
+    doc: Dict[str, Any], semaphore: asyncio.Semaphore
+) -> Optional[Dict[str, str]]:
+    s3_object_name = doc["metadata"]["s3_object_name"]
+    async with semaphore:
+        try:
+            data = await run_in_s3_executor(read_s3_object, s3_object_name)
+            derivatives = await asyncio.to_thread(derive, data)
+            if derivatives is None:
+                return None
+            return await upload_derivatives(s3_object_name, derivatives)
+        except Exception as e:
+            logger.error(f"Error creating derivatives for {doc['_id']}: {str(e)}")
+            return None
+
+
+async def backfill(batch_size: int, concurrency: int):
+    await connect_to_mongo()
+    images_collection = get_collection("images")
+    query = {
+        "metadata.derivatives": {"$exists": False},
+        "metadata.s3_object_name": {"$exists": True},
+    }
+    total = await images_collection.count_documents(query)
+    cursor = images_collection.find(query, {"metadata.s3_object_name": 1}).sort("_id", 1)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    done = 0
+    failed = 0
+    batch: List[Dict[str, Any]] = []
+
+    async def flush():
+        nonlocal done, failed
+        results = await asyncio.gather(*(backfill_photo(doc, semaphore) for doc in batch))
+        updates = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"metadata.derivatives": keys}})
+            for doc, keys in zip(batch, results)
+            if keys
+        ]
+        if updates:
+            await images_collection.bulk_write(updates, ordered=False)
+        done += len(batch)
+        failed += len(batch) - len(updates)
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        logger.info(
+            f"Backfilled {done}/{total} photos ({rate:.1f} photos/s, {failed} failed)"
+        )
+        batch.clear()
+
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    logger.info(f"Derivative backfill complete: {done - failed} photos, {failed} failed")
+    await close_clients()
+    await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ from crewai import Crew
 
 
 from tasks import FamilyBookTasks
-from utils.job_manager import append_event
+from utils.job_manager import append_event, update_job
 
 
 class FamilyBookCrew:
@@ -54,4 +54,5 @@ class FamilyBookCrew:
             return results
         except Exception as e:
             append_event(self.job_id, f"An error occurred: {e}")
+            update_job(self.job_id, status="FAILED", result=str(e))
             return str(e)
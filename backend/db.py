@@ -1,7 +1,28 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import base64
 from datetime import datetime, timezone
-import subprocess
+import functools
+import hashlib
+from io import BytesIO
+import json
 import tempfile
-from typing import Any, Dict, List, Optional, TypedDict
+from threading import Lock
+import time
+import uuid
+from typing import (
+    Any,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+)
 from urllib.parse import unquote
 from dotenv import load_dotenv
 
@@ -12,12 +33,12 @@ from motor.motor_asyncio import (
 )
 import os
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
 from botocore.config import Config
 from bson import ObjectId
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
-import requests
 
 from utils.log_config import setup_logger
 
@@ -26,8 +47,40 @@ load_dotenv()
 logger = setup_logger(__name__)
 
 
-def format_album(album: Dict[str, Any]) -> Dict[str, Any]:
-    """Helper function to ensure consistent album formatting across all endpoints"""
+def s3_key_from_url(url: str) -> str:
+    """Recover the S3 key from a stored or presigned object URL."""
+    return unquote(url.split("/")[-1].split("?")[0])
+
+
+def image_key_for_size(metadata: Dict[str, Any], size: str = "original") -> str:
+    """S3 key of the requested derivative, falling back to the original upload."""
+    if size != "original":
+        key = metadata.get("derivatives", {}).get(size)
+        if key:
+            return key
+    return metadata["s3_object_name"]
+
+
+def format_photo(photo: Dict[str, Any], size: str = "original") -> Dict[str, Any]:
+    return {
+        "id": str(photo["_id"]),
+        "url": generate_presigned_url(image_key_for_size(photo["metadata"], size)),
+        "createdAt": (
+            photo["created_at"].isoformat() if "created_at" in photo else None
+        ),
+    }
+
+
+def format_album(
+    album: Dict[str, Any], image_keys: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Helper function to ensure consistent album formatting across all endpoints
+
+    image_keys maps image IDs to the S3 key to sign instead of the original,
+    as returned by album_image_keys for a derivative size.
+    """
+    image_keys = image_keys or {}
     formatted_album = {
         "id": str(album["_id"]),
         "album_name": album["album_name"],
@@ -42,7 +95,7 @@ def format_album(album: Dict[str, Any]) -> Dict[str, Any]:
     for image in album.get("images", []):
         try:
             if "id" in image and "url" in image:
-                s3_key = unquote(image["url"].split("/")[-1].split("?")[0])
+                s3_key = image_keys.get(image["id"]) or s3_key_from_url(image["url"])
                 presigned_url = generate_presigned_url(s3_key)
                 formatted_album["images"].append({
                     "id": image["id"], 
@@ -60,12 +113,145 @@ def format_album(album: Dict[str, Any]) -> Dict[str, Any]:
     return formatted_album
 
 
+# Fields needed to render an album tile: the cover (first image) and a count,
+# computed server-side so the images array never leaves Mongo.
+ALBUM_SUMMARY_PROJECTION = {
+    "album_name": 1,
+    "description": 1,
+    "created_at": 1,
+    "images": {"$slice": [{"$ifNull": ["$images", []]}, 1]},
+    "image_count": {"$size": {"$ifNull": ["$images", []]}},
+}
+
+
+def format_album_summary(
+    album: Dict[str, Any], image_keys: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """Format a summary-projected album, signing only the cover image URL"""
+    image_keys = image_keys or {}
+    cover_image = None
+    for image in album.get("images", []):
+        try:
+            if "id" in image and "url" in image:
+                s3_key = image_keys.get(image["id"]) or s3_key_from_url(image["url"])
+                cover_image = {"id": image["id"], "url": generate_presigned_url(s3_key)}
+        except Exception:
+            pass
+
+    return {
+        "id": str(album["_id"]),
+        "album_name": album["album_name"],
+        "description": album.get("description", ""),
+        "cover_image": cover_image,
+        "image_count": album.get("image_count", 0),
+        "createdAt": album["created_at"].isoformat() if "created_at" in album else None,
+    }
+
+
+async def album_image_keys(
+    albums: List[Dict[str, Any]], size: str = "original"
+) -> Dict[str, str]:
+    """Look up the derivative key of every image in the albums with one query."""
+    if size == "original":
+        return {}
+    image_ids = [
+        image["id"] for album in albums for image in album.get("images", []) if "id" in image
+    ]
+    image_docs = await get_images_metadata(image_ids, projection={"metadata": 1})
+    return {
+        image_id: image_key_for_size(doc["metadata"], size)
+        for image_id, doc in image_docs.items()
+        if "metadata" in doc
+    }
+
+
+async def find_album_summaries(
+    skip: int, limit: int, match: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Return raw summary-projected album documents, newest first"""
+    albums_collection = get_collection("albums")
+    pipeline = []
+    if match:
+        pipeline.append({"$match": match})
+    pipeline.append({"$sort": NEWEST_FIRST})
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline += [{"$limit": limit}, {"$project": ALBUM_SUMMARY_PROJECTION}]
+    return await albums_collection.aggregate(pipeline).to_list(length=limit)
+
+
+# Keyset pagination: documents are ordered by (created_at, _id) descending and
+# a cursor records the last pair a client has seen.
+NEWEST_FIRST = {"created_at": -1, "_id": -1}
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    doc_id = doc["_id"]
+    payload = {
+        "created_at": doc["created_at"].isoformat(),
+        "id": str(doc_id),
+        "oid": isinstance(doc_id, ObjectId),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn an opaque cursor into a Mongo filter for the next page."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(payload["created_at"])
+        doc_id = ObjectId(payload["id"]) if payload["oid"] else payload["id"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}},
+        ]
+    }
+
+
+def next_cursor_for(docs: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    if len(docs) < limit or "created_at" not in docs[-1]:
+        return None
+    return encode_cursor(docs[-1])
+
+
 def object_id_to_str(obj):
     if isinstance(obj, ObjectId):
         return str(obj)
     return obj
 
 
+# Streamed uploads are sent as multipart in chunks of this size, so memory
+# held per upload stays bounded regardless of object size.
+S3_MULTIPART_CHUNK_SIZE = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", 8 * 1024 * 1024))
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_CHUNK_SIZE,
+    multipart_chunksize=S3_MULTIPART_CHUNK_SIZE,
+    max_concurrency=4,
+)
+
+
+# boto3 is synchronous, so every S3 network call made from a coroutine goes
+# through this bounded pool instead of running on the event loop.
+S3_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("S3_MAX_WORKERS", 16)), thread_name_prefix="s3"
+)
+
+
+async def run_in_s3_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        S3_EXECUTOR, functools.partial(func, *args, **kwargs)
+    )
+
+
+async_qdrant_client = AsyncQdrantClient(
+    host=os.getenv("QDRANT_HOST", "localhost"),
+    port=int(os.getenv("QDRANT_PORT", 6333)),
+)
+
 s3_client = boto3.client(
     "s3", region_name=os.getenv("AWS_REGION"), config=Config(signature_version="s3v4")
 )
@@ -135,6 +321,70 @@ async def connect_to_mongo():
         }
 
 
+# Indexes backing the listing sorts, keyset pagination and the album
+# membership lookups done when photos are deleted.
+MONGO_INDEXES = {
+    "images": [
+        ([("created_at", -1), ("_id", -1)], "created_at_id_desc"),
+    ],
+    "albums": [
+        ([("created_at", -1), ("_id", -1)], "created_at_id_desc"),
+        ([("images.id", 1)], "images_id"),
+    ],
+}
+
+
+async def ensure_indexes():
+    """Create the indexes the hot queries rely on. Safe to call repeatedly."""
+    for collection_name, indexes in MONGO_INDEXES.items():
+        collection = get_collection(collection_name)
+        for keys, name in indexes:
+            await collection.create_index(keys, name=name)
+            logger.info(f"Ensured index {name} on {collection_name}")
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = []
+    while plan:
+        stage = plan.get("stage")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def log_query_plans():
+    """Log the winning plan of each hot query so collection scans are easy to spot."""
+    newest_first = [("created_at", -1), ("_id", -1)]
+    hot_queries = {
+        "images by created_at": (get_collection("images"), {}, newest_first),
+        "albums by created_at": (get_collection("albums"), {}, newest_first),
+        "albums containing image": (
+            get_collection("albums"),
+            {"images.id": "explain-probe"},
+            None,
+        ),
+    }
+    for label, (collection, query, sort) in hot_queries.items():
+        try:
+            cursor = collection.find(query).limit(100)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+            level = logger.warning if any("COLLSCAN" in s for s in stages) else logger.info
+            level(f"Query plan for {label}: {' <- '.join(stages)}")
+        except Exception as e:
+            logger.error(f"Could not explain query {label}: {str(e)}")
+
+
+async def close_clients():
+    """Release the shared Qdrant client and the S3 thread pool."""
+    await async_qdrant_client.close()
+    S3_EXECUTOR.shutdown(wait=False)
+
+
 async def close_mongo_connection():
     client = MongoDB.client
     if client is not None:
@@ -159,42 +409,115 @@ def get_collection(name: str) -> AsyncIOMotorCollection:
 
 
 
+class PresignedUrlCache:
+    """
+    LRU cache of presigned URLs keyed by
+    (S3 key, disposition, audience, expiration).
+
+    Entries are handed out until refresh_margin seconds before the URL
+    expires, after which the next caller signs a fresh one.
+    """
+
+    def __init__(self, max_size: int = 10000, refresh_margin: int = 300):
+        self.max_size = max_size
+        self.refresh_margin = refresh_margin
+        self._entries: "OrderedDict[Tuple[str, str, bool, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, bool, int]) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] - self.refresh_margin <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple[str, str, bool, int], url: str, expiration: int):
+        with self._lock:
+            self._entries[key] = (url, time.monotonic() + expiration)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, s3_object_name: str):
+        self.invalidate_many([s3_object_name])
+
+    def invalidate_many(self, s3_object_names: Iterable[str]):
+        """Drop every cached URL for the given S3 keys in a single pass."""
+        s3_object_names = set(s3_object_names)
+        if not s3_object_names:
+            return
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in s3_object_names]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+presigned_url_cache = PresignedUrlCache(
+    max_size=int(os.getenv("PRESIGNED_URL_CACHE_SIZE", 10000)),
+    refresh_margin=int(os.getenv("PRESIGNED_URL_REFRESH_MARGIN", 300)),
+)
+
+
 def generate_presigned_url(s3_object_name: str, expiration: int = 3600, for_frontend: bool = True,  as_attachment: bool = False) -> str:
     """
     Generate a presigned URL for S3 object access.
-    
+
+    URLs are served from presigned_url_cache while they still have more than
+    the refresh margin left before expiring.
+
     Args:
         s3_object_name: The name/key of the S3 object
         expiration: URL expiration time in seconds
         for_frontend: If True, returns URL with localhost, if False, keeps internal minio URL
     """
     try:
+        disposition = None
+        if as_attachment:
+            filename = s3_object_name.split('/')[-1]
+            disposition = f'attachment; filename="{filename}"'
+
+        cache_key = (s3_object_name, disposition or "inline", for_frontend, expiration)
+        cached_url = presigned_url_cache.get(cache_key)
+        if cached_url:
+            return cached_url
+
         params = {
             'Bucket': S3Config.get_bucket_name(),
             'Key': s3_object_name,
         }
-        
-        if as_attachment:
-            filename = s3_object_name.split('/')[-1]
-            params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+        if disposition:
+            params['ResponseContentDisposition'] = disposition
 
         url = S3Config.client.generate_presigned_url(
             'get_object',
             Params=params,
             ExpiresIn=expiration,
         )
-        
+
         # Only replace minio:9000 with localhost:9000 for frontend access
         if for_frontend and 'minio:9000' in url:
             url = url.replace('minio:9000', 'localhost:9000')
-        
-        logger.info(f"Generated presigned URL for {s3_object_name}: {url}")
+
+        presigned_url_cache.put(cache_key, url, expiration)
+        logger.debug(f"Generated presigned URL for {s3_object_name}")
         return url
     except Exception as e:
         logger.error(f"Error generating presigned URL: {str(e)}")
         raise
 
-async def save_image(image_id: str, file_path: str, metadata: Dict[str, Any]) -> str:
+async def save_image(
+    image_id: str, file_path: Optional[str], metadata: Dict[str, Any]
+) -> str:
     images_collection = get_collection("images")
     result = await images_collection.insert_one(
         {
@@ -207,6 +530,99 @@ async def save_image(image_id: str, file_path: str, metadata: Dict[str, Any]) ->
     return str(result.inserted_id)
 
 
+async def save_images(images: List[Dict[str, Any]]) -> List[str]:
+    """
+    Bulk insert image documents with a single insert_many.
+
+    :param images: List of dicts with image_id, file_path and metadata
+    :return: List of inserted image IDs
+    """
+    if not images:
+        return []
+    images_collection = get_collection("images")
+    created_at = datetime.now(timezone.utc)
+    result = await images_collection.insert_many(
+        [
+            {
+                "_id": image["image_id"],
+                "file_path": image.get("file_path"),
+                "metadata": image["metadata"],
+                "created_at": created_at,
+            }
+            for image in images
+        ],
+        ordered=False,
+    )
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+
+async def sync_album_membership(image_ids: List[str]):
+    """
+    Write each image's current album IDs to the album_ids field of its Qdrant payload.
+
+    Membership is read from Mongo, images with the same set of albums share a
+    set_payload operation, and all operations go out in one batch request.
+    """
+    image_ids = list(dict.fromkeys(image_ids))
+    if not image_ids:
+        return
+    memberships: Dict[str, List[str]] = {image_id: [] for image_id in image_ids}
+    cursor = get_collection("albums").find(
+        {"images.id": {"$in": image_ids}}, {"images.id": 1}
+    )
+    async for album in cursor:
+        for image in album.get("images", []):
+            if image.get("id") in memberships:
+                memberships[image["id"]].append(str(album["_id"]))
+
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for image_id, album_ids in memberships.items():
+        groups.setdefault(tuple(sorted(set(album_ids))), []).append(image_id)
+
+    await async_qdrant_client.batch_update_points(
+        collection_name="family_book_images",
+        update_operations=[
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(
+                    payload={"album_ids": list(album_ids)}, points=points
+                )
+            )
+            for album_ids, points in groups.items()
+        ],
+    )
+
+
+async def save_albums(albums: List[Dict[str, Any]]) -> List[str]:
+    """
+    Bulk insert albums with a single insert_many.
+
+    :param albums: List of dicts with album_name, description, images and created_at
+    :return: List of inserted album IDs, in input order
+    """
+    if not albums:
+        return []
+    albums_collection = get_collection("albums")
+    result = await albums_collection.insert_many(
+        [
+            {
+                "album_name": album["album_name"],
+                "description": album["description"],
+                "images": album["images"],
+                "cover_image": album["images"][0] if album["images"] else None,
+                "created_at": album["created_at"],
+            }
+            for album in albums
+        ]
+    )
+    try:
+        await sync_album_membership(
+            [image["id"] for album in albums for image in album["images"]]
+        )
+    except Exception as e:
+        logger.error(f"Error updating album membership in Qdrant: {str(e)}")
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+
 async def save_album(
     album_name: str, description: str, images: List[Dict[str, str]], created_at
 ) -> str:
@@ -220,32 +636,43 @@ async def save_album(
             "created_at": created_at,
         }
     )
+    try:
+        await sync_album_membership([image["id"] for image in images])
+    except Exception as e:
+        # The album is saved; only album-filtered searches see stale membership
+        logger.error(f"Error updating album membership in Qdrant: {str(e)}")
     return str(result.inserted_id)
 
 
-async def generate_album_with_presigned_urls(
-    album_data: Dict[str, Any]
-) -> Dict[str, Any]:
+def album_images(
+    image_ids: List[str], image_docs: Dict[str, Dict[str, Any]]
+) -> List[Dict[str, str]]:
+    """Build an album's images list, keeping the order the retrieval returned."""
     images = []
-    for image_id in album_data.get("image_ids", []):
-        image_doc = await get_image_metadata(image_id)
+    for image_id in image_ids:
+        image_doc = image_docs.get(image_id)
         if not image_doc:
             logger.error(f"No metadata found for image ID: {image_id}")
             continue
-        if (
-            image_doc
-            and "metadata" in image_doc
-            and "s3_object_name" in image_doc["metadata"]
-        ):
+        if "metadata" in image_doc and "s3_object_name" in image_doc["metadata"]:
             try:
                 presigned_url = generate_presigned_url(
                     image_doc["metadata"]["s3_object_name"]
                 )
-                images.append({"id": str(image_id), "url": presigned_url})
+                images.append({"id": image_id, "url": presigned_url})
             except Exception as e:
                 logger.error(
                     f"Error generating presigned URL for image {image_id}: {str(e)}"
                 )
+    return images
+
+
+async def generate_album_with_presigned_urls(
+    album_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    image_ids = [str(image_id) for image_id in album_data.get("image_ids", [])]
+    image_docs = await get_images_metadata(image_ids)
+    images = album_images(image_ids, image_docs)
 
     if not images:
         raise ValueError("No valid images found for the album")
@@ -268,67 +695,139 @@ async def generate_album_with_presigned_urls(
     return result
 
 
-async def get_all_photos(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-    try:
-        images_collection = get_collection("images")
-        cursor = images_collection.find().sort("created_at", -1).skip(skip).limit(limit)
-        photos = await cursor.to_list(length=limit)
-        return [
+async def generate_albums_with_presigned_urls(
+    albums_data: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Save several generated albums at once.
+
+    Image metadata for every album is fetched with one query and the albums
+    are written with one insert_many. Albums left without valid images are
+    skipped rather than failing the whole batch.
+    """
+    image_ids_per_album = [
+        [str(image_id) for image_id in album_data.get("image_ids", [])]
+        for album_data in albums_data
+    ]
+    image_docs = await get_images_metadata(
+        list({image_id for image_ids in image_ids_per_album for image_id in image_ids})
+    )
+
+    created_at = datetime.now(timezone.utc)
+    albums = []
+    for album_data, image_ids in zip(albums_data, image_ids_per_album):
+        images = album_images(image_ids, image_docs)
+        if not images:
+            logger.error(f"No valid images found for album {album_data['album_name']}")
+            continue
+        albums.append(
             {
-                "id": str(photo["_id"]),
-                "url": generate_presigned_url(photo["metadata"]["s3_object_name"]),
-                "createdAt": (
-                    photo["created_at"].isoformat() if "created_at" in photo else None
-                ),
+                "album_name": album_data["album_name"],
+                "description": album_data["description"],
+                "images": images,
+                "created_at": created_at,
             }
-            for photo in photos
-        ]
+        )
+
+    album_ids = await save_albums(albums)
+    return [
+        {
+            "id": album_id,
+            "album_name": album["album_name"],
+            "description": album["description"],
+            "images": album["images"],
+            "cover_image": album["images"][0],
+            "createdAt": created_at.isoformat(),
+        }
+        for album_id, album in zip(album_ids, albums)
+    ]
+
+
+async def get_all_photos(
+    skip: int = 0, limit: int = 100, cursor: Optional[str] = None, size: str = "original"
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return a page of photos and the cursor for the following page.
+
+    When a cursor is given it takes precedence over skip.
+    """
+    try:
+        images_collection = get_collection("images")
+        if cursor:
+            query = images_collection.find(decode_cursor(cursor))
+        else:
+            query = images_collection.find().skip(skip)
+        photos = await query.sort(list(NEWEST_FIRST.items())).limit(limit).to_list(
+            length=limit
+        )
+        return [format_photo(photo, size) for photo in photos], next_cursor_for(
+            photos, limit
+        )
     except Exception as e:
         logger.error(f"Error in get_all_photos: {str(e)}")
         raise
 
 
-async def get_all_albums(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+async def get_all_albums(
+    skip: int = 0,
+    limit: int = 100,
+    summary: bool = False,
+    cursor: Optional[str] = None,
+    size: str = "original",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return a page of albums and the cursor for the following page.
+
+    When a cursor is given it takes precedence over skip.
+    """
     try:
+        match = decode_cursor(cursor) if cursor else None
+        if cursor:
+            skip = 0
+        if summary:
+            albums = await find_album_summaries(skip, limit, match)
+            image_keys = await album_image_keys(albums, size)
+            return [
+                format_album_summary(album, image_keys) for album in albums
+            ], next_cursor_for(albums, limit)
         albums_collection = get_collection("albums")
-        cursor = albums_collection.find().sort("created_at", -1).skip(skip).limit(limit)
-        albums = await cursor.to_list(length=limit)
-        # Log formatted albums
-
-        logger.info(f"all_albums: {[format_album(album) for album in albums]}")
-        return [format_album(album) for album in albums]
+        query = albums_collection.find(match or {}).sort(list(NEWEST_FIRST.items()))
+        albums = await query.skip(skip).limit(limit).to_list(length=limit)
+        logger.info(f"all_albums: fetched {len(albums)} albums")
+        image_keys = await album_image_keys(albums, size)
+        return [format_album(album, image_keys) for album in albums], next_cursor_for(
+            albums, limit
+        )
     except Exception as e:
         logger.error(f"Error in get_all_albums: {str(e)}")
         raise
 
 
-async def get_recent_photos(limit: int = 4) -> List[Dict[str, Any]]:
+async def get_recent_photos(limit: int = 4, size: str = "original") -> List[Dict[str, Any]]:
     try:
         images_collection = get_collection("images")
         cursor = images_collection.find().sort("created_at", -1).limit(limit)
         photos = await cursor.to_list(length=limit)
-        return [
-            {
-                "id": str(photo["_id"]),
-                "url": generate_presigned_url(photo["metadata"]["s3_object_name"]),
-                "createdAt": (
-                    photo["created_at"].isoformat() if "created_at" in photo else None
-                ),
-            }
-            for photo in photos
-        ]
+        return [format_photo(photo, size) for photo in photos]
     except Exception as e:
         logger.error(f"Error in get_recent_photos: {str(e)}")
         raise
 
 
-async def get_recent_albums(limit: int = 4) -> List[Dict[str, Any]]:
+async def get_recent_albums(
+    limit: int = 4, summary: bool = False, size: str = "original"
+) -> List[Dict[str, Any]]:
     try:
+        if summary:
+            albums = await find_album_summaries(0, limit)
+            image_keys = await album_image_keys(albums, size)
+            return [format_album_summary(album, image_keys) for album in albums]
         albums_collection = get_collection("albums")
         cursor = albums_collection.find().sort("created_at", -1).limit(limit)
         albums = await cursor.to_list(length=None)
-        logger.info(f"recent_albums: {[format_album(album) for album in albums]}")
-        return [format_album(album) for album in albums]
+        logger.info(f"recent_albums: fetched {len(albums)} albums")
+        image_keys = await album_image_keys(albums, size)
+        return [format_album(album, image_keys) for album in albums]
     except Exception as e:
         logger.error(f"Error in get_recent_albums: {str(e)}")
         raise
@@ -339,7 +838,25 @@ async def get_image_metadata(image_id: str):
     return await images_collection.find_one({"_id": image_id})
 
 
-async def get_album_by_id(album_id: str) -> Dict[str, Any]:
+async def get_images_metadata(
+    image_ids: List[str], projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch many image documents with a single $in query.
+
+    :param image_ids: Image IDs to look up; duplicates are fetched once
+    :param projection: Optional Mongo projection
+    :return: Mapping of image ID to document; missing IDs are absent
+    """
+    unique_ids = list(dict.fromkeys(image_ids))
+    if not unique_ids:
+        return {}
+    images_collection = get_collection("images")
+    cursor = images_collection.find({"_id": {"$in": unique_ids}}, projection)
+    return {str(doc["_id"]): doc for doc in await cursor.to_list(length=len(unique_ids))}
+
+
+async def get_album_by_id(album_id: str, size: str = "original") -> Dict[str, Any]:
     try:
         albums_collection = get_collection("albums")
         object_id = ObjectId(album_id)
@@ -349,15 +866,22 @@ async def get_album_by_id(album_id: str) -> Dict[str, Any]:
             logger.error(f"No album found with ID: {album_id}")
             return None
 
-        formatted_album = format_album(album)
+        formatted_album = format_album(album, await album_image_keys([album], size))
 
-        # Add video_url if it exists (specific to album detail view)
-        if album.get("video_url"):
-            video_filename = unquote(album["video_url"].split("/")[-1].split("?")[0])
+        # Add video_url if it exists (specific to album detail view). A preview
+        # only exists while a newer full-quality render is in progress, so it
+        # takes precedence until the full render replaces it.
+        video_url = album.get("preview_video_url") or album.get("video_url")
+        if video_url:
+            video_filename = s3_key_from_url(video_url)
             s3_video_key = f"generated-video/{video_filename}"
             formatted_album["video_url"] = generate_presigned_url(s3_video_key, for_frontend=True)  # Make sure for_frontend is True
+            formatted_album["video_quality"] = (
+                "preview" if album.get("preview_video_url") else "full"
+            )
         else:
             formatted_album["video_url"] = None
+            formatted_album["video_quality"] = None
 
         return formatted_album
     except Exception as e:
@@ -365,77 +889,380 @@ async def get_album_by_id(album_id: str) -> Dict[str, Any]:
         raise
 
 
-async def update_album_with_video(album_id: str, video_url: str):
+async def update_album_with_video(
+    album_id: str, video_url: str, video_fingerprint: Optional[str] = None
+) -> List[str]:
+    """
+    Store the full-quality video URL and fingerprint and drop any preview.
+
+    :return: URLs of the videos this one replaces (previous full video and preview)
+    """
+    albums_collection = get_collection("albums")
+    previous = await albums_collection.find_one_and_update(
+        {"_id": ObjectId(album_id)},
+        {
+            "$set": {"video_url": video_url, "video_fingerprint": video_fingerprint},
+            "$unset": {"preview_video_url": ""},
+        },
+        projection={"video_url": 1, "preview_video_url": 1},
+    )
+    if not previous:
+        return []
+    return [
+        url
+        for url in (previous.get("video_url"), previous.get("preview_video_url"))
+        if url and url != video_url
+    ]
+
+
+async def update_album_with_preview(album_id: str, preview_video_url: str) -> Optional[str]:
+    """Store a preview video URL, returning the preview it replaces."""
+    albums_collection = get_collection("albums")
+    previous = await albums_collection.find_one_and_update(
+        {"_id": ObjectId(album_id)},
+        {"$set": {"preview_video_url": preview_video_url}},
+        projection={"preview_video_url": 1},
+    )
+    return previous.get("preview_video_url") if previous else None
+
+
+async def clear_album_preview(album_id: str, preview_video_url: str):
+    """Unlink a preview video from the album, if it is still the linked one, and delete it."""
     albums_collection = get_collection("albums")
     await albums_collection.update_one(
-        {"_id": ObjectId(album_id)}, {"$set": {"video_url": video_url}}
+        {"_id": ObjectId(album_id), "preview_video_url": preview_video_url},
+        {"$unset": {"preview_video_url": ""}},
+    )
+    await delete_videos([preview_video_url])
+
+
+async def get_album_video_key(album_id: str) -> Optional[str]:
+    """Return the S3 key of the album's full-quality video, ignoring any preview."""
+    album = await get_collection("albums").find_one(
+        {"_id": ObjectId(album_id)}, {"video_url": 1}
+    )
+    if not album or not album.get("video_url"):
+        return None
+    return f"generated-video/{s3_key_from_url(album['video_url'])}"
+
+
+VIDEO_FETCH_CONCURRENCY = int(os.getenv("VIDEO_FETCH_CONCURRENCY", 8))
+
+
+def read_s3_object(s3_object_name: str) -> BytesIO:
+    """Read a whole S3 object into memory."""
+    response = S3Config.client.get_object(
+        Bucket=S3Config.get_bucket_name(), Key=s3_object_name
+    )
+    return BytesIO(response["Body"].read())
+
+
+def download_s3_object(s3_object_name: str, path: str):
+    """Stream an object from S3 to a local path in chunks."""
+    S3Config.client.download_file(
+        S3Config.get_bucket_name(), s3_object_name, path, Config=S3_TRANSFER_CONFIG
     )
 
 
-def download_image(presigned_url: str, path: str):
+async def fetch_album_images(
+    images: List[Dict[str, str]], workspace: str, concurrency: int = VIDEO_FETCH_CONCURRENCY
+) -> List[str]:
+    """
+    Download album images from S3 by key into workspace, concurrently.
+
+    :return: Local paths in album order; images that fail to download are skipped
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(index: int, image: Dict[str, str]) -> Optional[str]:
+        s3_object_name = s3_key_from_url(image["url"])
+        image_path = os.path.join(workspace, f"image_{index}.jpg")
+        async with semaphore:
+            try:
+                await run_in_s3_executor(download_s3_object, s3_object_name, image_path)
+                return image_path
+            except Exception as e:
+                logger.error(f"Error downloading image {s3_object_name}: {str(e)}")
+                return None
+
+    paths = await asyncio.gather(
+        *(fetch(index, image) for index, image in enumerate(images))
+    )
+    return [path for path in paths if path]
+
+
+# Render profiles. Every setting is part of the video fingerprint, so changing
+# one invalidates cached renders made with the old value.
+VIDEO_PROFILES = {
+    "preview": {
+        "width": 640,
+        "height": 360,
+        "preset": "ultrafast",
+        "crf": 32,
+        "seconds_per_image": 3,
+        "pix_fmt": "yuv420p",
+    },
+    "full": {
+        "width": 1280,
+        "height": 720,
+        "preset": "medium",
+        "crf": 23,
+        "seconds_per_image": 3,
+        "pix_fmt": "yuv420p",
+    },
+}
+VIDEO_SETTINGS = VIDEO_PROFILES["full"]
+
+
+def video_fingerprint(album: dict, settings: Dict[str, Any] = VIDEO_SETTINGS) -> str:
+    """Hash the ordered image keys and encoding settings of an album video."""
+    payload = {
+        "images": [s3_key_from_url(image["url"]) for image in album["images"]],
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def build_ffmpeg_command(
+    file_list_path: str, output_path: str, settings: Dict[str, Any] = VIDEO_SETTINGS
+) -> List[str]:
+    width, height = settings["width"], settings["height"]
+    return [
+        "ffmpeg",
+        "-y",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        file_list_path,
+        "-vf",
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,format={settings['pix_fmt']}",
+        "-vsync",
+        "vfr",
+        "-c:v",
+        "libx264",
+        "-preset",
+        settings["preset"],
+        "-crf",
+        str(settings["crf"]),
+        "-pix_fmt",
+        settings["pix_fmt"],
+        output_path,
+    ]
+
+
+def s3_object_exists(s3_object_name: str) -> bool:
     try:
-        if 'localhost:9000' in presigned_url:
-            presigned_url = presigned_url.replace('localhost:9000', 'minio:9000')
-        
-        logger.info(f"Downloading image from: {presigned_url}")
-        response = requests.get(presigned_url)
-        response.raise_for_status()
-        with open(path, "wb") as file:
-            file.write(response.content)
-    except requests.RequestException as e:
-        logger.error(f"Error downloading image: {str(e)}")
-        raise
+        S3Config.client.head_object(Bucket=S3Config.get_bucket_name(), Key=s3_object_name)
+        return True
+    except Exception:
+        return False
 
 
-async def create_video(album: dict):
+async def find_cached_video(
+    album: dict, settings: Dict[str, Any] = VIDEO_SETTINGS
+) -> Optional[str]:
+    """
+    Return the album's existing full-quality video URL if it was rendered from
+    the same images and settings and the object is still in S3.
+    """
+    albums_collection = get_collection("albums")
+    album_doc = await albums_collection.find_one(
+        {"_id": ObjectId(album["id"])}, {"video_url": 1, "video_fingerprint": 1}
+    )
+    if not album_doc or not album_doc.get("video_url"):
+        return None
+    if album_doc.get("video_fingerprint") != video_fingerprint(album, settings):
+        return None
+    s3_video_key = f"generated-video/{s3_key_from_url(album_doc['video_url'])}"
+    if not await run_in_s3_executor(s3_object_exists, s3_video_key):
+        return None
+    return album_doc["video_url"]
+
+
+async def delete_videos(video_urls: List[str]):
+    for video_url in video_urls:
+        video_key = f"generated-video/{s3_key_from_url(video_url)}"
+        try:
+            await run_in_s3_executor(
+                S3Config.client.delete_object,
+                Bucket=S3Config.get_bucket_name(),
+                Key=video_key,
+            )
+        except Exception as e:
+            logger.error(f"Error deleting previous video {video_key}: {str(e)}")
+
+
+async def run_ffmpeg_async(command: List[str]):
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg exited with code {process.returncode}: "
+            f"{stderr.decode(errors='replace')[-500:]}"
+        )
+
+
+async def create_video(
+    album: dict,
+    settings: Dict[str, Any] = VIDEO_SETTINGS,
+    preview_settings: Optional[Dict[str, Any]] = None,
+    render: Optional[Callable[[List[str]], Awaitable[Any]]] = None,
+    on_stage: Optional[Callable[[str, Dict[str, float]], Awaitable[None]]] = None,
+) -> str:
+    """
+    Render an album slideshow with ffmpeg and upload it to S3.
+
+    When preview_settings is given, a quick preview is rendered and linked on
+    the album first; the full-quality render replaces it when done.
+
+    :param album: Formatted album as returned by get_album_by_id
+    :param settings: Render profile for the final video
+    :param preview_settings: Optional render profile for the preview
+    :param render: Coroutine function that runs the ffmpeg command; defaults to
+        an asyncio subprocess in this process
+    :param on_stage: Coroutine function awaited with the stage name
+        ("rendering_preview", "preview_uploaded", "rendering", "uploading",
+        "uploaded") and the timings collected so far
+    :return: S3 URL of the uploaded full-quality video
+    """
+    render = render or run_ffmpeg_async
+    fingerprint = video_fingerprint(album, settings)
+    timings = {}
+    preview_url = None
+
+    async def stage(name: str):
+        if on_stage:
+            await on_stage(name, dict(timings))
+
+    async def encode(profile: Dict[str, Any], output_path: str, timing_key: str):
+        file_list_path = os.path.join(temp_dir, f"file_list_{timing_key}.txt")
+        with open(file_list_path, "w") as file:
+            for image_file in image_files:
+                file.write(f"file '{image_file}'\n")
+                file.write(f"duration {profile['seconds_per_image']}\n")
+        start = time.perf_counter()
+        await render(build_ffmpeg_command(file_list_path, output_path, profile))
+        timings[timing_key] = round(time.perf_counter() - start, 3)
+
     try:
         with tempfile.TemporaryDirectory() as temp_dir:
-            image_files = []
-            for i, image in enumerate(album["images"]):
-                image_path = os.path.join(temp_dir, f"image_{i}.jpg")
-                internal_url = image["url"].replace('localhost:9000', 'minio:9000')
-                logger.info(f"Downloading image from internal URL: {internal_url}")
-                download_image(internal_url, image_path)
-                image_files.append(image_path)
-
-            file_list_path = os.path.join(temp_dir, "file_list.txt")
-            with open(file_list_path, "w") as file:
-                for image_file in image_files:
-                    file.write(f"file '{image_file}'\n")
-                    file.write("duration 3\n")
+            start = time.perf_counter()
+            image_files = await fetch_album_images(album["images"], temp_dir)
+            if not image_files:
+                raise ValueError("No images could be downloaded for the album")
+            timings["fetch_seconds"] = round(time.perf_counter() - start, 3)
+            if len(image_files) < len(album["images"]):
+                # Don't let a partial render be reused as if it were complete
+                fingerprint = None
+            logger.info(
+                f"Fetched {len(image_files)} images for album {album['id']} video"
+            )
 
-            output_path = os.path.join(temp_dir, f"album_{album['id']}_video.mp4")
-            ffmpeg_command = [
-                "ffmpeg",
-                "-f",
-                "concat",
-                "-safe",
-                "0",
-                "-i",
-                file_list_path,
-                "-vf",
-                "scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2,format=yuv420p",
-                "-vsync",
-                "vfr",
-                "-pix_fmt",
-                "yuv420p",
-                output_path,
-            ]
-            subprocess.run(ffmpeg_command, check=True)
-
-            s3_key = f"generated-video/album_{album['id']}_video.mp4"
-            s3_url = upload_file_to_s3(output_path, s3_key)
-
-            if s3_url:
-                await update_album_with_video(album["id"], s3_url)
-                logger.info(
-                    f"Video generated and uploaded successfully for album {album['id']}"
+            # Content-addressed keys, so a new render never overwrites a video
+            # that is still being served
+            key_suffix = (fingerprint or uuid.uuid4().hex)[:16]
+
+            if preview_settings:
+                await stage("rendering_preview")
+                preview_path = os.path.join(temp_dir, f"album_{album['id']}_preview.mp4")
+                await encode(preview_settings, preview_path, "preview_render_seconds")
+                preview_key = f"generated-video/album_{album['id']}_{key_suffix}_preview.mp4"
+                preview_url = await run_in_s3_executor(
+                    upload_file_to_s3, preview_path, preview_key
                 )
-            else:
-                logger.error(f"Failed to upload video for album {album['id']}")
+                if preview_url:
+                    previous_preview = await update_album_with_preview(
+                        album["id"], preview_url
+                    )
+                    if previous_preview and previous_preview != preview_url:
+                        await delete_videos([previous_preview])
+                    await stage("preview_uploaded")
+                else:
+                    logger.error(f"Failed to upload preview video for album {album['id']}")
+
+            await stage("rendering")
+            output_path = os.path.join(temp_dir, f"album_{album['id']}_video.mp4")
+            await encode(settings, output_path, "render_seconds")
+
+            await stage("uploading")
+            start = time.perf_counter()
+            s3_key = f"generated-video/album_{album['id']}_{key_suffix}.mp4"
+            s3_url = await run_in_s3_executor(upload_file_to_s3, output_path, s3_key)
+            if not s3_url:
+                raise RuntimeError(f"Failed to upload video for album {album['id']}")
+            replaced = await update_album_with_video(album["id"], s3_url, fingerprint)
+            await delete_videos(replaced)
+            timings["upload_seconds"] = round(time.perf_counter() - start, 3)
+
+            logger.info(
+                f"Video generated and uploaded successfully for album {album['id']}: {timings}"
+            )
+            await stage("uploaded")
+            return s3_url
 
     except Exception as e:
         logger.error(f"Error generating video for album {album['id']}: {str(e)}")
+        if preview_url:
+            # Don't leave a preview of a render that never completed
+            try:
+                await clear_album_preview(album["id"], preview_url)
+            except Exception as cleanup_error:
+                logger.error(
+                    f"Error clearing preview video for album {album['id']}: {str(cleanup_error)}"
+                )
+        raise
+
+
+def s3_url_for(object_name: str) -> str:
+    endpoint_url = os.getenv("S3_ENDPOINT_URL", "http://minio:9000")
+    return f"{endpoint_url}/{S3Config.get_bucket_name()}/{object_name}"
+
+
+class _KeepOpenFile:
+    """File object proxy whose close() does nothing."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+
+    def __getattr__(self, name: str):
+        return getattr(self._fileobj, name)
+
+    def close(self):
+        pass
+
+
+def upload_fileobj_to_s3(
+    fileobj: BinaryIO, object_name: str, content_type: Optional[str] = None
+) -> Optional[str]:
+    """
+    Stream a file-like object to S3 using multipart upload.
+
+    The object is read in S3_MULTIPART_CHUNK_SIZE chunks, so it never has to be
+    fully loaded into memory or written to local disk first. It is left open:
+    boto3 closes the file it is given for single-part uploads, so it gets a
+    proxy that keeps the caller's file readable afterwards.
+    """
+    extra_args = {"ContentType": content_type} if content_type else None
+    try:
+        fileobj.seek(0)
+        S3Config.client.upload_fileobj(
+            _KeepOpenFile(fileobj),
+            S3Config.get_bucket_name(),
+            object_name,
+            ExtraArgs=extra_args,
+            Config=S3_TRANSFER_CONFIG,
+        )
+        return s3_url_for(object_name)
+    except Exception as e:
+        logger.error(f"Error uploading to S3: {e}")
+        return None
 
 
 def upload_file_to_s3(
@@ -444,73 +1271,126 @@ def upload_file_to_s3(
     if object_name is None:
         object_name = os.path.basename(file_path)
     try:
-        S3Config.client.upload_file(file_path, S3Config.get_bucket_name(), object_name)
-        endpoint_url = os.getenv("S3_ENDPOINT_URL", "http://minio:9000")
-        return f"{endpoint_url}/{S3Config.get_bucket_name()}/{object_name}"
+        S3Config.client.upload_file(
+            file_path, S3Config.get_bucket_name(), object_name, Config=S3_TRANSFER_CONFIG
+        )
+        return s3_url_for(object_name)
         # return f"https://{S3Config.get_bucket_name()}.s3.amazonaws.com/{object_name}"
     except Exception as e:
         logger.error(f"Error uploading to S3: {e}")
         return None
 
 
+S3_DELETE_CHUNK_SIZE = 1000  # S3 DeleteObjects accepts at most 1,000 keys
+
+
+def delete_s3_objects(keys: List[str]) -> List[str]:
+    """
+    Delete keys with DeleteObjects in chunks of S3_DELETE_CHUNK_SIZE.
+
+    :return: Keys that could not be deleted
+    """
+    failed_keys = []
+    for offset in range(0, len(keys), S3_DELETE_CHUNK_SIZE):
+        chunk = keys[offset : offset + S3_DELETE_CHUNK_SIZE]
+        try:
+            response = S3Config.client.delete_objects(
+                Bucket=S3Config.get_bucket_name(),
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+            for error in response.get("Errors", []):
+                logger.error(f"Error deleting {error['Key']} from S3: {error.get('Message')}")
+                failed_keys.append(error["Key"])
+        except Exception as e:
+            logger.error(f"Error deleting photos from S3: {str(e)}")
+            failed_keys.extend(chunk)
+    return failed_keys
+
+
 async def delete_multiple_photos(image_ids: List[str]) -> Dict[str, Any]:
     """
     Delete multiple photos from the database, S3, and Qdrant.
 
+    Each store is hit with one bulk request (S3 in chunks of 1,000 keys)
+    rather than once per photo.
+
     :param image_ids: List of photo IDs to delete
     :return: Dictionary with successful and failed deletions
     """
     results = {"successful": [], "failed": []}
     images_collection = get_collection("images")
     albums_collection = get_collection("albums")
-    qdrant_client = QdrantClient("localhost", port=6333)
-    logger.info(f"Attempting to delete photos: {image_ids}")
+    logger.info(f"Attempting to delete {len(image_ids)} photos")
 
-    for image_id in image_ids:
-        try:
-            photo_doc = await images_collection.find_one({"_id": image_id})
-            if not photo_doc:
-                results["failed"].append(image_id)
-                continue
-
-            # Delete from S3
-            s3_object_name = photo_doc["metadata"]["s3_object_name"]
-            try:
-                S3Config.client.delete_object(
-                    Bucket=S3Config.get_bucket_name(), Key=s3_object_name
-                )
-            except Exception as e:
-                logger.error(f"Error deleting photo from S3: {str(e)}")
-                results["failed"].append(image_id)
-                continue
-
-            # Delete from MongoDB
-            delete_result = await images_collection.delete_one({"_id": image_id})
-            if delete_result.deleted_count == 0:
-                results["failed"].append(image_id)
-                continue
-
-            # Remove from albums
-            await albums_collection.update_many(
-                {"images.id": image_id}, {"$pull": {"images": {"id": image_id}}}
-            )
+    try:
+        photo_docs = await get_images_metadata(
+            image_ids,
+            projection={"metadata.s3_object_name": 1, "metadata.derivatives": 1},
+        )
+    except Exception as e:
+        logger.error(f"Error looking up photos to delete: {str(e)}")
+        results["failed"] = list(image_ids)
+        return results
+
+    keys_by_id = {}
+    derivative_keys = []
+    for image_id in dict.fromkeys(image_ids):
+        photo_doc = photo_docs.get(image_id)
+        if not photo_doc:
+            results["failed"].append(image_id)
+            continue
+        keys_by_id[image_id] = photo_doc["metadata"]["s3_object_name"]
+        derivative_keys.extend(photo_doc["metadata"].get("derivatives", {}).values())
+    presigned_url_cache.invalidate_many([*keys_by_id.values(), *derivative_keys])
+
+    # Delete from S3. Derivatives that fail to delete are only logged, since
+    # nothing references them once the photo document is gone.
+    failed_keys = set(
+        await run_in_s3_executor(
+            delete_s3_objects, list(keys_by_id.values()) + derivative_keys
+        )
+    )
+    deletable_ids = []
+    for image_id, s3_object_name in keys_by_id.items():
+        if s3_object_name in failed_keys:
+            results["failed"].append(image_id)
+        else:
+            deletable_ids.append(image_id)
+    if not deletable_ids:
+        return results
 
-            # Delete from Qdrant
-            try:
-                qdrant_client.delete(
-                    collection_name="family_book_images",
-                    points_selector=models.PointIdsList(points=[image_id]),
-                )
-                logger.info(f"Successfully deleted image {image_id} from Qdrant")
-            except Exception as e:
-                logger.error(f"Error deleting image from Qdrant: {str(e)}")
-                # We don't add to failed here as the main storage (MongoDB and S3) deletions were successful
+    try:
+        # Delete from MongoDB
+        delete_result = await images_collection.delete_many(
+            {"_id": {"$in": deletable_ids}}
+        )
+        if delete_result.deleted_count != len(deletable_ids):
+            remaining = await get_images_metadata(deletable_ids, projection={"_id": 1})
+            results["failed"].extend(remaining)
+            deletable_ids = [i for i in deletable_ids if i not in remaining]
+
+        # Remove from albums
+        await albums_collection.update_many(
+            {"images.id": {"$in": deletable_ids}},
+            {"$pull": {"images": {"id": {"$in": deletable_ids}}}},
+        )
+    except Exception as e:
+        logger.error(f"Error deleting photos from MongoDB: {str(e)}")
+        results["failed"].extend(deletable_ids)
+        return results
 
-            results["successful"].append(image_id)
-        except Exception as e:
-            logger.error(f"Error deleting photo with ID {image_id}: {str(e)}")
-            results["failed"].append(image_id)
+    # Delete from Qdrant
+    try:
+        await async_qdrant_client.delete(
+            collection_name="family_book_images",
+            points_selector=models.PointIdsList(points=deletable_ids),
+        )
+        logger.info(f"Successfully deleted {len(deletable_ids)} images from Qdrant")
+    except Exception as e:
+        logger.error(f"Error deleting images from Qdrant: {str(e)}")
+        # We don't add to failed here as the main storage (MongoDB and S3) deletions were successful
 
+    results["successful"] = deletable_ids
     return results
 
 
@@ -524,6 +1404,17 @@ async def delete_multiple_albums(album_ids: List[str]) -> Dict[str, Any]:
     results = {"successful": [], "failed": []}
     albums_collection = get_collection("albums")
 
+    # Remember the member images so their Qdrant album_ids can be refreshed
+    object_ids = [ObjectId(album_id) for album_id in album_ids if ObjectId.is_valid(album_id)]
+    member_ids = [
+        image["id"]
+        async for album in albums_collection.find(
+            {"_id": {"$in": object_ids}}, {"images.id": 1}
+        )
+        for image in album.get("images", [])
+        if "id" in image
+    ]
+
     for album_id in album_ids:
         try:
             object_id = ObjectId(album_id)
@@ -536,6 +1427,11 @@ async def delete_multiple_albums(album_ids: List[str]) -> Dict[str, Any]:
             logger.error(f"Error deleting album with ID {album_id}: {str(e)}")
             results["failed"].append(album_id)
 
+    try:
+        await sync_album_membership(member_ids)
+    except Exception as e:
+        logger.error(f"Error updating album membership in Qdrant: {str(e)}")
+
     return results
 
 
@@ -0,0 +1,219 @@
+from collections import OrderedDict
+import math
+import os
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from PIL import Image
+from qdrant_client import AsyncQdrantClient
+
+from db import async_qdrant_client, get_collection
+from tools import collection_name
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Two photos are near-duplicates when their 64-bit dHashes differ in at most
+# DUPLICATE_HASH_RADIUS bits and their CLIP vectors agree to
+# DUPLICATE_CLIP_THRESHOLD cosine similarity.
+DUPLICATE_HASH_RADIUS = int(os.getenv("DUPLICATE_HASH_RADIUS", 6))
+DUPLICATE_CLIP_THRESHOLD = float(os.getenv("DUPLICATE_CLIP_THRESHOLD", 0.95))
+# "flag" stores the photo and reports what it duplicates, "skip" drops it
+DUPLICATE_POLICY = os.getenv("DUPLICATE_POLICY", "flag")
+
+HASH_BITS = 64
+HASH_BANDS = 8
+BAND_BITS = HASH_BITS // HASH_BANDS
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit difference hash: one bit per horizontally adjacent pixel pair of a
+    9x8 grayscale thumbnail, set when the left pixel is brighter.
+    """
+    pixels = list(
+        image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata()
+    )
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def format_hash(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class PerceptualHashIndex:
+    """
+    In-memory Hamming-radius index over 64-bit perceptual hashes.
+
+    Each hash is split into HASH_BANDS bands of BAND_BITS bits, with one exact
+    lookup table per band. Two hashes within radius < HASH_BANDS bits of each
+    other must agree exactly on at least one band, so a search only compares
+    the hashes sharing a band with the query instead of every stored hash.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._hashes: Dict[str, int] = {}
+        self._bands: List[Dict[int, Set[str]]] = [{} for _ in range(HASH_BANDS)]
+
+    @staticmethod
+    def _band_values(value: int) -> List[int]:
+        mask = (1 << BAND_BITS) - 1
+        return [(value >> (band * BAND_BITS)) & mask for band in range(HASH_BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, image_id: str, value: int):
+        with self._lock:
+            self._remove(image_id)
+            self._hashes[image_id] = value
+            for band, band_value in enumerate(self._band_values(value)):
+                self._bands[band].setdefault(band_value, set()).add(image_id)
+
+    def remove(self, image_ids: Iterable[str]):
+        with self._lock:
+            for image_id in image_ids:
+                self._remove(image_id)
+
+    def _remove(self, image_id: str):
+        value = self._hashes.pop(image_id, None)
+        if value is None:
+            return
+        for band, band_value in enumerate(self._band_values(value)):
+            bucket = self._bands[band].get(band_value)
+            if bucket is not None:
+                bucket.discard(image_id)
+                if not bucket:
+                    del self._bands[band][band_value]
+
+    def search(self, value: int, radius: int) -> List[Tuple[str, int]]:
+        """Return (image_id, distance) for stored hashes within radius bits, closest first."""
+        with self._lock:
+            candidates = set()
+            for band, band_value in enumerate(self._band_values(value)):
+                candidates |= self._bands[band].get(band_value, set())
+            matches = []
+            for image_id in candidates:
+                distance = hamming_distance(value, self._hashes[image_id])
+                if distance <= radius:
+                    matches.append((image_id, distance))
+        return sorted(matches, key=lambda match: match[1])
+
+
+class DuplicateDetector:
+    """
+    Near-duplicate lookup for ingest.
+
+    Candidates come from the perceptual hash index and are confirmed against
+    their CLIP vectors. Vectors of recently ingested photos are kept in a small
+    LRU so photos from the same burst or batch can be confirmed before their
+    Qdrant upsert lands; older vectors are retrieved from Qdrant.
+
+    The index is loaded from Mongo at startup and kept per process.
+    """
+
+    def __init__(
+        self,
+        qdrant_client: AsyncQdrantClient,
+        radius: int = DUPLICATE_HASH_RADIUS,
+        threshold: float = DUPLICATE_CLIP_THRESHOLD,
+        recent_size: int = 256,
+    ):
+        if radius >= HASH_BANDS:
+            raise ValueError(f"DUPLICATE_HASH_RADIUS must be below {HASH_BANDS}")
+        self.qdrant_client = qdrant_client
+        self.radius = radius
+        self.threshold = threshold
+        self.recent_size = recent_size
+        self.index = PerceptualHashIndex()
+        self._recent: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = Lock()
+
+    async def load(self):
+        """Fill the hash index from the phash stored with every image document."""
+        cursor = get_collection("images").find(
+            {"metadata.phash": {"$exists": True}}, {"metadata.phash": 1}
+        )
+        async for doc in cursor:
+            self.index.add(doc["_id"], int(doc["metadata"]["phash"], 16))
+        logger.info(f"Loaded {len(self.index)} perceptual hashes")
+
+    def register(self, image_id: str, phash: int, embedding: List[float]):
+        self.index.add(image_id, phash)
+        with self._lock:
+            self._recent[image_id] = embedding
+            self._recent.move_to_end(image_id)
+            while len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+
+    def forget(self, image_ids: Iterable[str]):
+        image_ids = list(image_ids)
+        self.index.remove(image_ids)
+        with self._lock:
+            for image_id in image_ids:
+                self._recent.pop(image_id, None)
+
+    async def _vectors(self, image_ids: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            vectors = {
+                image_id: self._recent[image_id]
+                for image_id in image_ids
+                if image_id in self._recent
+            }
+        missing = [image_id for image_id in image_ids if image_id not in vectors]
+        if missing:
+            points = await self.qdrant_client.retrieve(
+                collection_name=collection_name,
+                ids=missing,
+                with_payload=False,
+                with_vectors=True,
+            )
+            vectors.update({str(point.id): point.vector for point in points})
+        return vectors
+
+    async def find_duplicate(
+        self, phash: int, embedding: List[float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the closest confirmed near-duplicate as
+        {"image_id", "hash_distance", "similarity"}, or None.
+        """
+        candidates = self.index.search(phash, self.radius)
+        if not candidates:
+            return None
+        vectors = await self._vectors([image_id for image_id, _ in candidates])
+        best = None
+        for image_id, distance in candidates:
+            vector = vectors.get(image_id)
+            if vector is None:
+                continue
+            similarity = cosine_similarity(embedding, vector)
+            if similarity >= self.threshold and (
+                best is None or similarity > best["similarity"]
+            ):
+                best = {
+                    "image_id": image_id,
+                    "hash_distance": distance,
+                    "similarity": round(similarity, 4),
+                }
+        return best
+
+
+duplicate_detector = DuplicateDetector(async_qdrant_client)
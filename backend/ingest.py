@@ -0,0 +1,508 @@
+import asyncio
+from datetime import datetime
+from io import BytesIO
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageOps
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Batch, PointIdsList
+from pymongo.errors import BulkWriteError
+
+from db import (
+    delete_s3_objects,
+    run_in_s3_executor,
+    save_image,
+    save_images,
+    upload_file_to_s3,
+    upload_fileobj_to_s3,
+)
+from duplicates import (
+    DUPLICATE_POLICY,
+    duplicate_detector,
+    format_hash,
+    perceptual_hash,
+)
+from tools import collection_name, get_embedding_engine, image_payload, read_capture_date
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 16))
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", 8))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Web-size derivatives generated at ingest: longest edge in pixels, stored
+# under their own S3 prefix and recorded in metadata.derivatives.
+DERIVATIVE_SIZES = {"thumb": 320, "medium": 1280}
+DERIVATIVE_FORMAT = os.getenv("DERIVATIVE_FORMAT", "WEBP").upper()
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", 80))
+DERIVATIVE_EXTENSIONS = {"WEBP": ("webp", "image/webp"), "JPEG": ("jpg", "image/jpeg")}
+
+# An image source is either a path on disk or a seekable file object such as
+# the spooled buffer behind a FastAPI UploadFile.
+ImageSource = Union[str, BinaryIO]
+
+
+def open_image(source: ImageSource) -> Image.Image:
+    if not isinstance(source, str):
+        source.seek(0)
+    return Image.open(source)
+
+
+def spool_to_temp_file(fileobj: BinaryIO, suffix: str = "") -> str:
+    """
+    Copy a file object to a uniquely named temp file in fixed-size chunks.
+
+    The caller is responsible for removing the returned path.
+    """
+    fileobj.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(fileobj, tmp, UPLOAD_CHUNK_SIZE)
+        return tmp.name
+
+
+def decode_images(sources: List[ImageSource]) -> List[Optional[Image.Image]]:
+    """
+    Decode images to upright RGB.
+
+    Images that cannot be decoded get None in their slot so callers can
+    report them individually.
+    """
+    return [image for image, _ in decode_images_with_dates(sources)]
+
+
+def decode_images_with_dates(
+    sources: List[ImageSource],
+) -> List[Tuple[Optional[Image.Image], Optional[datetime]]]:
+    """Like decode_images, also returning each photo's EXIF capture date."""
+    decoded = []
+    for position, source in enumerate(sources):
+        try:
+            with open_image(source) as image:
+                captured_at = read_capture_date(image)
+                decoded.append(
+                    (ImageOps.exif_transpose(image).convert("RGB"), captured_at)
+                )
+        except Exception as e:
+            logger.error(f"Error decoding image at position {position}: {str(e)}")
+            decoded.append((None, None))
+    return decoded
+
+
+def embed_decoded(images: List[Optional[Image.Image]]) -> List[Optional[List[float]]]:
+    """Embed the decoded images in one CLIP forward pass, keeping None slots."""
+    positions = [position for position, image in enumerate(images) if image is not None]
+    embeddings: List[Optional[List[float]]] = [None] * len(images)
+    for position, embedding in zip(
+        positions,
+        get_embedding_engine().embed_images([images[p] for p in positions]),
+    ):
+        embeddings[position] = embedding
+    return embeddings
+
+
+def embed_image_files(sources: List[ImageSource]) -> List[Optional[List[float]]]:
+    """Decode and embed several images in one CLIP forward pass."""
+    return embed_decoded(decode_images(sources))
+
+
+def build_derivatives(image: Image.Image) -> Dict[str, bytes]:
+    """Encode a downscaled copy of the image for every size in DERIVATIVE_SIZES."""
+    derivatives = {}
+    for size, max_edge in DERIVATIVE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, format=DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY)
+        derivatives[size] = buffer.getvalue()
+    return derivatives
+
+
+def analyze_image_files(
+    sources: List[ImageSource],
+) -> List[Optional[Tuple[Image.Image, List[float], Optional[datetime], int]]]:
+    """
+    Decode each image once and return the decoded image, its embedding, EXIF
+    capture date and perceptual hash.
+
+    Derivatives are encoded separately, after the duplicate check, so skipped
+    duplicates cost no encoding work. Images that cannot be decoded get None
+    in their slot.
+    """
+    decoded = decode_images_with_dates(sources)
+    embeddings = embed_decoded([image for image, _ in decoded])
+    return [
+        None if image is None else (image, embedding, captured_at, perceptual_hash(image))
+        for (image, captured_at), embedding in zip(decoded, embeddings)
+    ]
+
+
+def derivative_key(size: str, s3_object_name: str) -> str:
+    extension, _ = DERIVATIVE_EXTENSIONS[DERIVATIVE_FORMAT]
+    return f"{size}/{os.path.splitext(s3_object_name)[0]}.{extension}"
+
+
+async def upload_derivatives(
+    s3_object_name: str, derivatives: Dict[str, bytes]
+) -> Dict[str, str]:
+    """
+    Upload encoded derivatives next to the original.
+
+    :return: Mapping of size to S3 key for the derivatives that were stored
+    """
+    _, content_type = DERIVATIVE_EXTENSIONS[DERIVATIVE_FORMAT]
+
+    async def upload(size: str, data: bytes) -> Tuple[str, Optional[str]]:
+        key = derivative_key(size, s3_object_name)
+        s3_url = await run_in_s3_executor(
+            upload_fileobj_to_s3, BytesIO(data), key, content_type
+        )
+        return size, key if s3_url else None
+
+    uploaded = await asyncio.gather(
+        *(upload(size, data) for size, data in derivatives.items())
+    )
+    return {size: key for size, key in uploaded if key}
+
+
+async def index_images(
+    qdrant_client: AsyncQdrantClient,
+    image_ids: List[str],
+    embeddings: List[List[float]],
+    payloads: List[Dict[str, Any]],
+):
+    """Upsert a batch of image vectors with one multi-point request."""
+    await qdrant_client.upsert(
+        collection_name=collection_name,
+        points=Batch(ids=image_ids, vectors=embeddings, payloads=payloads),
+    )
+
+
+async def index_image(
+    qdrant_client: AsyncQdrantClient,
+    image_id: str,
+    embedding: List[float],
+    payload: Dict[str, Any],
+):
+    """Upsert a single image vector into the Qdrant collection."""
+    await qdrant_client.upsert(
+        collection_name=collection_name,
+        points=Batch(ids=[image_id], vectors=[embedding], payloads=[payload]),
+    )
+
+
+async def find_duplicate(
+    image_id: str, phash: int, embedding: List[float]
+) -> Optional[Dict[str, Any]]:
+    """
+    Look up a near-duplicate of the photo. A failing check (e.g. Qdrant being
+    unreachable) is logged and treated as no duplicate, so it never blocks
+    the upload.
+    """
+    try:
+        return await duplicate_detector.find_duplicate(phash, embedding)
+    except Exception as e:
+        logger.error(f"Duplicate check failed for image {image_id}: {str(e)}")
+        return None
+
+
+async def discard_image(
+    qdrant_client: AsyncQdrantClient, image_id: str, s3_keys: List[str], indexed: bool
+):
+    """Best-effort removal of whatever was stored for an image whose ingest failed."""
+    if indexed:
+        try:
+            await qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=[image_id]),
+            )
+        except Exception as e:
+            logger.error(f"Could not delete image {image_id} from Qdrant: {str(e)}")
+    if s3_keys:
+        failed_keys = await run_in_s3_executor(delete_s3_objects, s3_keys)
+        if failed_keys:
+            logger.error(f"Could not delete uploads of image {image_id} from S3: {failed_keys}")
+
+
+async def ingest_image(
+    qdrant_client: AsyncQdrantClient,
+    source: ImageSource,
+    image_id: str,
+    metadata: Dict[str, Any],
+    duplicate_policy: str = DUPLICATE_POLICY,
+    content_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Deterministic upload pipeline: decode -> CLIP embed -> duplicate check ->
+    S3 upload -> Qdrant upsert -> Mongo metadata.
+
+    This does the same work the image upload agent would do through
+    ImageUploadTool, without an LLM deciding to call the tool. The original is
+    only stored under metadata["s3_object_name"] once it has decoded, and if a
+    later step fails everything stored for it is removed before re-raising.
+    A confirmed near-duplicate is reported in duplicate_of; with the "skip"
+    policy it is not stored at all (skipped=True).
+
+    :raises ValueError: if the source is not a readable image
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    analyzed = (await asyncio.to_thread(analyze_image_files, [source]))[0]
+    if analyzed is None:
+        raise ValueError("Uploaded file is not a readable image")
+    image, embedding, captured_at, phash = analyzed
+    metadata["captured_at"] = captured_at
+    metadata["phash"] = format_hash(phash)
+    timings["embed_seconds"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    duplicate = await find_duplicate(image_id, phash, embedding)
+    timings["duplicate_check_seconds"] = round(time.perf_counter() - start, 3)
+    if duplicate:
+        logger.info(f"Image {image_id} is a near-duplicate of {duplicate['image_id']}")
+        if duplicate_policy == "skip":
+            return {
+                "image_id": image_id,
+                "s3_url": None,
+                "timings": timings,
+                "duplicate_of": duplicate,
+                "skipped": True,
+            }
+        metadata["duplicate_of"] = duplicate["image_id"]
+
+    stored_keys: List[str] = []
+    indexed = False
+    try:
+        start = time.perf_counter()
+        s3_object_name = metadata["s3_object_name"]
+        if isinstance(source, str):
+            s3_url = await run_in_s3_executor(upload_file_to_s3, source, s3_object_name)
+        else:
+            s3_url = await run_in_s3_executor(
+                upload_fileobj_to_s3, source, s3_object_name, content_type
+            )
+        if not s3_url:
+            raise RuntimeError("Failed to upload to S3")
+        stored_keys.append(s3_object_name)
+        metadata["s3_url"] = s3_url
+        timings["upload_seconds"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        derivatives = await asyncio.to_thread(build_derivatives, image)
+        metadata["derivatives"] = await upload_derivatives(s3_object_name, derivatives)
+        stored_keys.extend(metadata["derivatives"].values())
+        timings["derivatives_seconds"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        payload = image_payload(image_id, metadata.get("original_filename"), captured_at)
+        await index_image(qdrant_client, image_id, embedding, payload)
+        indexed = True
+        timings["index_seconds"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        await save_image(image_id, source if isinstance(source, str) else None, metadata)
+        timings["metadata_seconds"] = round(time.perf_counter() - start, 3)
+    except Exception:
+        await discard_image(qdrant_client, image_id, stored_keys, indexed)
+        raise
+
+    # Only a photo with a saved document may be reported as a duplicate
+    duplicate_detector.register(image_id, phash, embedding)
+    logger.info(f"Ingested image {image_id}: {timings}")
+    return {
+        "image_id": image_id,
+        "s3_url": s3_url,
+        "timings": timings,
+        "duplicate_of": duplicate,
+        "skipped": False,
+    }
+
+
+async def ingest_images(
+    qdrant_client: AsyncQdrantClient,
+    uploads: List[Dict[str, Any]],
+    duplicate_policy: str = DUPLICATE_POLICY,
+) -> List[Dict[str, Any]]:
+    """
+    Batched upload pipeline for many images at once.
+
+    Embeddings are computed INGEST_BATCH_SIZE images per forward pass, and
+    only photos that decode and survive the duplicate check are uploaded to S3
+    (concurrently) and indexed with one Qdrant upsert per batch. All metadata
+    is written with a single insert_many. Near-duplicates are reported in
+    duplicate_of; with the "skip" policy they get status "skipped" and are
+    never stored. Anything stored for a photo that fails a later step
+    (original, derivatives, Qdrant point) is deleted again.
+
+    :param uploads: List of dicts with image_id, fileobj, s3_object_name,
+        original_filename and content_type
+    :return: One result dict per upload, in input order
+    """
+    results = {
+        upload["image_id"]: {
+            "image_id": upload["image_id"],
+            "filename": upload["original_filename"],
+            "status": "failed",
+            "error": None,
+            "duplicate_of": None,
+        }
+        for upload in uploads
+    }
+
+    semaphore = asyncio.Semaphore(S3_UPLOAD_CONCURRENCY)
+
+    async def upload(item):
+        async with semaphore:
+            return await run_in_s3_executor(
+                upload_fileobj_to_s3,
+                item["fileobj"],
+                item["s3_object_name"],
+                item.get("content_type"),
+            )
+
+    def stored_keys(item: Dict[str, Any]) -> List[str]:
+        return [item["s3_object_name"], *item["derivative_keys"].values()]
+
+    indexed = []
+    # S3 objects of photos that failed after being stored
+    abandoned_keys = []
+    for offset in range(0, len(uploads), INGEST_BATCH_SIZE):
+        batch = [dict(item) for item in uploads[offset : offset + INGEST_BATCH_SIZE]]
+        analyzed = await asyncio.to_thread(
+            analyze_image_files, [item["fileobj"] for item in batch]
+        )
+
+        # Checked one at a time so a burst inside the batch is caught too
+        embedded = []
+        images = []
+        for item, result in zip(batch, analyzed):
+            if result is None:
+                results[item["image_id"]]["error"] = "Failed to decode image"
+                continue
+            image, embedding, item["captured_at"], phash = result
+            item["phash"] = format_hash(phash)
+            duplicate = await find_duplicate(item["image_id"], phash, embedding)
+            results[item["image_id"]]["duplicate_of"] = duplicate
+            if duplicate:
+                item["duplicate_of"] = duplicate["image_id"]
+                if duplicate_policy == "skip":
+                    results[item["image_id"]]["status"] = "skipped"
+                    continue
+            duplicate_detector.register(item["image_id"], phash, embedding)
+            embedded.append((item, embedding))
+            images.append(image)
+        if not embedded:
+            continue
+
+        all_derivatives = await asyncio.to_thread(
+            lambda: [build_derivatives(image) for image in images]
+        )
+
+        start = time.perf_counter()
+        s3_urls, derivative_keys = await asyncio.gather(
+            asyncio.gather(*(upload(item) for item, _ in embedded)),
+            asyncio.gather(
+                *(
+                    upload_derivatives(item["s3_object_name"], derivatives)
+                    for (item, _), derivatives in zip(embedded, all_derivatives)
+                )
+            ),
+        )
+        logger.info(
+            f"Uploaded {len(embedded)} images to S3 in {time.perf_counter() - start:.2f}s"
+        )
+
+        stored = []
+        for (item, embedding), s3_url, keys in zip(embedded, s3_urls, derivative_keys):
+            item["derivative_keys"] = keys
+            if s3_url:
+                item["s3_url"] = s3_url
+                stored.append((item, embedding))
+            else:
+                results[item["image_id"]]["error"] = "Failed to upload to S3"
+                duplicate_detector.forget([item["image_id"]])
+                abandoned_keys.extend(keys.values())
+        embedded = stored
+        if not embedded:
+            continue
+
+        try:
+            await index_images(
+                qdrant_client,
+                [item["image_id"] for item, _ in embedded],
+                [embedding for _, embedding in embedded],
+                [
+                    image_payload(
+                        item["image_id"], item["original_filename"], item["captured_at"]
+                    )
+                    for item, _ in embedded
+                ],
+            )
+            indexed.extend(item for item, _ in embedded)
+        except Exception as e:
+            logger.error(f"Error indexing image batch: {str(e)}")
+            duplicate_detector.forget(item["image_id"] for item, _ in embedded)
+            for item, _ in embedded:
+                results[item["image_id"]]["error"] = "Failed to index image"
+                abandoned_keys.extend(stored_keys(item))
+
+    unsaved = []
+    try:
+        await save_images(
+            [
+                {
+                    "image_id": item["image_id"],
+                    "metadata": {
+                        "image_id": item["image_id"],
+                        "original_filename": item["original_filename"],
+                        "s3_url": item["s3_url"],
+                        "s3_object_name": item["s3_object_name"],
+                        "derivatives": item["derivative_keys"],
+                        "captured_at": item["captured_at"],
+                        "phash": item["phash"],
+                        "duplicate_of": item.get("duplicate_of"),
+                    },
+                }
+                for item in indexed
+            ]
+        )
+    except BulkWriteError as e:
+        # insert_many is unordered, so only the reported documents are missing
+        failed_positions = {error["index"] for error in e.details.get("writeErrors", [])}
+        logger.error(
+            f"Error saving {len(failed_positions)} of {len(indexed)} image documents: {str(e)}"
+        )
+        unsaved = [item for position, item in enumerate(indexed) if position in failed_positions]
+    except Exception as e:
+        logger.error(f"Error saving image metadata batch: {str(e)}")
+        unsaved = list(indexed)
+
+    unsaved_ids = {item["image_id"] for item in unsaved}
+    for item in indexed:
+        if item["image_id"] in unsaved_ids:
+            results[item["image_id"]]["error"] = "Failed to save image metadata"
+        else:
+            results[item["image_id"]].update(status="success", s3_url=item["s3_url"])
+
+    if unsaved:
+        duplicate_detector.forget(unsaved_ids)
+        try:
+            await qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=list(unsaved_ids)),
+            )
+        except Exception as e:
+            logger.error(f"Could not delete unsaved images from Qdrant: {str(e)}")
+        abandoned_keys.extend(key for item in unsaved for key in stored_keys(item))
+
+    if abandoned_keys:
+        failed_keys = await run_in_s3_executor(delete_s3_objects, abandoned_keys)
+        if failed_keys:
+            logger.error(f"Could not delete abandoned uploads from S3: {failed_keys}")
+
+    return [results[upload["image_id"]] for upload in uploads]
@@ -1,41 +1,66 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import json
 import os
 import uuid
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional, Union
-
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from qdrant_client import QdrantClient
 
 import boto3
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from album_jobs import (
+    ALBUM_MAX_IMAGES,
+    ALBUM_MODE,
+    AlbumGenerationQueue,
+    AlbumQueueFull,
+    CrewResult,
+)
 from crew import FamilyBookCrew
 from db import (
+    async_qdrant_client,
+    close_clients,
     connect_to_mongo,
     close_mongo_connection,
-    create_video,
     delete_multiple_albums,
     delete_multiple_photos,
-    generate_album_with_presigned_urls,
     generate_presigned_url,
     get_album_by_id,
+    get_album_video_key,
     get_all_albums,
     get_all_photos,
     get_recent_albums,
     get_recent_photos,
+    VIDEO_PROFILES,
+    ensure_indexes,
+    find_cached_video,
+    log_query_plans,
+    presigned_url_cache,
+    run_in_s3_executor,
     save_image,
-    upload_file_to_s3,
+    upload_fileobj_to_s3,
 )
+from duplicates import DUPLICATE_POLICY, duplicate_detector
+from ingest import ingest_image, ingest_images, spool_to_temp_file
 from middleware import add_middleware
-from tools import ensure_qdrant_collection
+from tools import ensure_qdrant_collection, get_embedding_engine, text_embedding_cache
 from utils.log_config import setup_logger
-
-# Define CrewOutput as a type alias for what crew.kickoff() might return
-CrewResult = Union[str, Dict[str, Any]]
+from utils.job_manager import TERMINAL_STATUSES, events_since, get_job, update_job
+from utils.loop_monitor import loop_lag_monitor
+from video_jobs import video_render_queue
 
 # Initialize logger and Qdrant client
 logger = setup_logger(__name__)
@@ -45,51 +70,38 @@ qdrant_client = QdrantClient(
     port=int(os.getenv("QDRANT_PORT", 6333))
 )
 
-def parse_string_to_dict(s: str) -> dict:
-    """Parse a string that looks like a dictionary into an actual dictionary."""
-    try:
-        # First, try to parse it as JSON
-        return json.loads(s)
-    except json.JSONDecodeError:
-        # If JSON parsing fails, use custom parsing method
-        s = s.strip().strip("{}")
-        pairs = [pair.split(":", 1) for pair in s.split('",')]
-        result = {}
-        for key, value in pairs:
-            key = key.strip().strip('"')
-            value = value.strip().strip('"')
-            if value.startswith("[") and value.endswith("]"):
-                value = [v.strip().strip('"') for v in value[1:-1].split(",")]
-            result[key] = value
-        return result
-
-def parse_crew_result(result: CrewResult) -> Dict[str, Any]:
-    """Parse and validate the crew result into a consistent format."""
-    logger.debug(f"Parsing crew result of type: {type(result)}")
-    logger.debug(f"Raw result: {result!r}")
-
-    if isinstance(result, str):
-        try:
-            album_data = json.loads(result)
-        except json.JSONDecodeError:
-            album_data = parse_string_to_dict(result)
-    elif isinstance(result, dict):
-        album_data = result
-    else:
-        raise ValueError(f"Unexpected result format from album generation: {result}")
+# "direct" runs the deterministic ingest pipeline, "agent" routes uploads through CrewAI
+UPLOAD_MODE = os.getenv("UPLOAD_MODE", "direct")
+
+# crew.kickoff() is synchronous (LLM calls, CLIP inference), so it runs here
+# rather than on the event loop
+CREW_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CREW_MAX_WORKERS", 2)), thread_name_prefix="crew"
+)
+
+album_generation_queue = AlbumGenerationQueue(qdrant_client)
 
-    # Validate required keys
-    required_keys = ["album_name", "description", "image_ids"]
-    if not all(key in album_data for key in required_keys):
-        missing_keys = [key for key in required_keys if key not in album_data]
-        raise ValueError(f"Invalid album data format: missing keys {missing_keys}")
 
-    return album_data
+async def run_crew(crew: FamilyBookCrew) -> CrewResult:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(CREW_EXECUTOR, crew.kickoff)
+
+
+def s3_list_buckets():
+    s3_client = boto3.client(
+        's3',
+        endpoint_url="http://minio:9000",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION")
+    )
+    return s3_client.list_buckets()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting application...")
-    
+    loop_lag_monitor.start()
+
     # Test MongoDB connection
     try:
         await connect_to_mongo()
@@ -98,9 +110,16 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to connect to MongoDB: {e}")
         raise
 
+    try:
+        await ensure_indexes()
+        await log_query_plans()
+    except Exception as e:
+        logger.error(f"Failed to ensure MongoDB indexes: {e}")
+        raise
+
     # Test Qdrant connection
     try:
-        collections = qdrant_client.get_collections()
+        collections = await async_qdrant_client.get_collections()
         logger.info(f"Successfully connected to Qdrant at {os.getenv('QDRANT_HOST')}:{os.getenv('QDRANT_PORT')}")
         logger.info(f"Available collections: {collections}")
     except Exception as e:
@@ -109,14 +128,7 @@ async def lifespan(app: FastAPI):
 
     # Test MinIO/S3 connection
     try:
-        s3_client = boto3.client(
-            's3',
-            endpoint_url="http://minio:9000",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.getenv("AWS_REGION")
-        )
-        buckets = s3_client.list_buckets()
+        buckets = await run_in_s3_executor(s3_list_buckets)
         logger.info(f"Successfully connected to MinIO/S3")
         logger.info(f"Available buckets: {buckets}")
     except Exception as e:
@@ -124,16 +136,27 @@ async def lifespan(app: FastAPI):
         raise
 
     try:
-        ensure_qdrant_collection()
+        await asyncio.to_thread(ensure_qdrant_collection)
         logger.info("Qdrant collection setup complete")
     except Exception as e:
         logger.error(f"Failed to setup Qdrant collection: {e}")
         raise
 
+    await duplicate_detector.load()
+
+    video_render_queue.start()
+    await video_render_queue.recover()
+    album_generation_queue.start()
+
     logger.info("All services connected successfully")
     yield
     
     # Cleanup
+    await video_render_queue.stop()
+    await album_generation_queue.stop()
+    await loop_lag_monitor.stop()
+    CREW_EXECUTOR.shutdown(wait=False)
+    await close_clients()
     await close_mongo_connection()
     logger.info("Application shutdown complete")
 
@@ -164,7 +187,7 @@ async def health_check():
     
     # Check Qdrant
     try:
-        collections = qdrant_client.get_collections()
+        collections = await async_qdrant_client.get_collections()
         health_status["services"]["qdrant"] = {
             "status": "connected",
             "collections": [c.name for c in collections.collections]
@@ -175,14 +198,7 @@ async def health_check():
     
     # Check MinIO/S3
     try:
-        s3_client = boto3.client(
-            's3',
-            endpoint_url="http://minio:9000",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.getenv("AWS_REGION")
-        )
-        buckets = s3_client.list_buckets()
+        buckets = await run_in_s3_executor(s3_list_buckets)
         health_status["services"]["minio"] = {
             "status": "connected",
             "buckets": [b["Name"] for b in buckets["Buckets"]]
@@ -191,10 +207,21 @@ async def health_check():
         health_status["services"]["minio"] = f"error: {str(e)}"
         health_status["status"] = "degraded"
 
+    health_status["embedding_engine"] = dict(get_embedding_engine().metrics)
+    health_status["event_loop_lag"] = loop_lag_monitor.snapshot()
+    health_status["presigned_url_cache"] = presigned_url_cache.stats()
+    health_status["text_embedding_cache"] = text_embedding_cache.stats()
+
     return health_status
 
 
 # Pydantic models
+MAX_BATCH_THEMES = int(os.getenv("MAX_BATCH_THEMES", 24))
+
+# Image variants listing endpoints can sign: the upload itself or a derivative
+IMAGE_SIZE_PATTERN = "^(original|medium|thumb)$"
+DUPLICATE_POLICY_PATTERN = "^(flag|skip)$"
+
 class BulkDeletePhotosRequest(BaseModel):
     photo_ids: List[str]
 
@@ -204,32 +231,80 @@ class BulkDeleteAlbumsRequest(BaseModel):
 class AlbumRequest(BaseModel):
     theme: str
 
+class BatchAlbumRequest(BaseModel):
+    themes: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_THEMES)
+    dedupe: bool = True
+    images_per_album: int = Field(ALBUM_MAX_IMAGES, ge=1, le=50)
+
+class VideoRenderRequest(BaseModel):
+    # libx264 with yuv420p needs even dimensions
+    width: int = Field(VIDEO_PROFILES["full"]["width"], ge=160, le=3840, multiple_of=2)
+    height: int = Field(VIDEO_PROFILES["full"]["height"], ge=90, le=2160, multiple_of=2)
+    preset: str = Field(
+        VIDEO_PROFILES["full"]["preset"],
+        pattern="^(ultrafast|superfast|veryfast|faster|fast|medium|slow|slower|veryslow)$",
+    )
+    crf: int = Field(VIDEO_PROFILES["full"]["crf"], ge=0, le=51)
+    seconds_per_image: float = Field(
+        VIDEO_PROFILES["full"]["seconds_per_image"], gt=0, le=60
+    )
+    preview: bool = True
+
 @app.post("/upload-image")
-async def upload_image(file: UploadFile = File(...)):
+async def upload_image(
+    file: UploadFile = File(...),
+    mode: Optional[str] = Query(None, pattern="^(direct|agent)$"),
+    on_duplicate: Optional[str] = Query(None, pattern=DUPLICATE_POLICY_PATTERN),
+):
+    mode = mode or UPLOAD_MODE
+    file_path = None
     try:
-        # Save the uploaded file
-        contents = await file.read()
-        file_path = f"/tmp/{file.filename}"
-        with open(file_path, "wb") as f:
-            f.write(contents)
-
-        # Generate IDs and upload to S3
         image_id = str(uuid.uuid4())
         s3_object_name = f"{image_id}-{file.filename}"
-        s3_url = upload_file_to_s3(file_path, s3_object_name)
-
-        if not s3_url:
-            logger.error("Failed to upload to S3")
-            return {"error": "Failed to upload to S3"}
-
-        # Save metadata
         metadata = {
             "image_id": image_id,
             "original_filename": file.filename,
-            "s3_url": s3_url,
             "s3_object_name": s3_object_name,
         }
 
+        if mode == "direct":
+            # Decoded, embedded and checked for duplicates before anything is
+            # stored; ingest_image uploads the original and cleans up on failure
+            try:
+                ingest_result = await ingest_image(
+                    async_qdrant_client,
+                    file.file,
+                    image_id,
+                    metadata,
+                    duplicate_policy=on_duplicate or DUPLICATE_POLICY,
+                    content_type=file.content_type,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {
+                "image_id": None if ingest_result["skipped"] else image_id,
+                "s3_url": ingest_result["s3_url"],
+                "mode": mode,
+                "timings": ingest_result["timings"],
+                "duplicate_of": ingest_result["duplicate_of"],
+                "skipped": ingest_result["skipped"],
+            }
+
+        # Stream the upload (already spooled by FastAPI) straight to S3
+        s3_url = await run_in_s3_executor(
+            upload_fileobj_to_s3, file.file, s3_object_name, file.content_type
+        )
+
+        if not s3_url:
+            logger.error("Failed to upload to S3")
+            return {"error": "Failed to upload to S3"}
+        metadata["s3_url"] = s3_url
+
+        # The agent's ImageUploadTool reads from disk, so give it a unique temp file
+        file_path = await asyncio.to_thread(
+            spool_to_temp_file, file.file, os.path.splitext(file.filename)[1]
+        )
+
         # Save to MongoDB
         mongo_result = await save_image(image_id, file_path, metadata)
         if not mongo_result:
@@ -237,20 +312,70 @@ async def upload_image(file: UploadFile = File(...)):
             return {"error": "Failed to save image metadata"}
 
         # Process with crew
-        crew = FamilyBookCrew("upload_job", qdrant_client)
+        job_id = f"upload-{uuid.uuid4()}"
+        crew = FamilyBookCrew(job_id, qdrant_client)
         crew.setup_crew(image_data=file_path, image_id=image_id)
-        crew_result = crew.kickoff()
+        crew_result = await run_crew(crew)
+        # kickoff() records its own failures; don't overwrite them
+        job = await asyncio.to_thread(get_job, job_id)
+        if job is not None and job["status"] != "FAILED":
+            await asyncio.to_thread(update_job, job_id, status="COMPLETED")
 
-        return {"image_id": image_id, "s3_url": s3_url, "crew_result": crew_result}
+        return {
+            "image_id": image_id,
+            "s3_url": s3_url,
+            "mode": mode,
+            "job_id": job_id,
+            "crew_result": crew_result,
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in upload_image: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+@app.post("/upload-images")
+async def upload_images(
+    files: List[UploadFile] = File(...),
+    on_duplicate: Optional[str] = Query(None, pattern=DUPLICATE_POLICY_PATTERN),
+):
+    try:
+        uploads = []
+        for file in files:
+            image_id = str(uuid.uuid4())
+            uploads.append(
+                {
+                    "image_id": image_id,
+                    "fileobj": file.file,
+                    "s3_object_name": f"{image_id}-{file.filename}",
+                    "original_filename": file.filename,
+                    "content_type": file.content_type,
+                }
+            )
+
+        results = await ingest_images(
+            async_qdrant_client, uploads, duplicate_policy=on_duplicate or DUPLICATE_POLICY
+        )
+        successful = [r for r in results if r["status"] == "success"]
+        skipped = [r for r in results if r["status"] == "skipped"]
+        return {
+            "message": f"Uploaded {len(successful)} of {len(results)} photos successfully"
+            + (f", skipped {len(skipped)} duplicates" if skipped else ""),
+            "results": results,
+        }
+    except Exception as e:
+        logger.error(f"Error in upload_images: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate-album")
 async def generate_album(
     image: Optional[UploadFile] = File(None),
-    theme: Optional[str] = Form(None)
+    theme: Optional[str] = Form(None),
+    mode: Optional[str] = Query(None, pattern="^(fast|agent)$"),
 ):
     try:
         if not image and not theme:
@@ -262,15 +387,12 @@ async def generate_album(
 
         uploaded_image_path = None
         if image:
-            # Handle image upload
-            contents = await image.read()
-            file_path = f"/tmp/{image.filename}"
-            with open(file_path, "wb") as f:
-                f.write(contents)
-
+            # Stream the query image straight to S3
             image_id = str(uuid.uuid4())
             s3_object_name = f"generated-album/{image_id}-{image.filename}"
-            s3_url = upload_file_to_s3(file_path, s3_object_name)
+            s3_url = await run_in_s3_executor(
+                upload_fileobj_to_s3, image.file, s3_object_name, image.content_type
+            )
 
             if not s3_url:
                 logger.error("Failed to upload to S3")
@@ -282,38 +404,49 @@ async def generate_album(
             uploaded_image_path = s3_url
             logger.info(f"Image uploaded to S3: {uploaded_image_path}")
 
-        # Set up crew
-        crew = FamilyBookCrew("album_job", qdrant_client)
-        if uploaded_image_path:
-            logger.info(f"Processing image-based album generation: {uploaded_image_path}")
-            crew.setup_crew(uploaded_image_path=uploaded_image_path)
-        else:
-            logger.info(f"Processing theme-based album generation: {theme}")
-            crew.setup_crew(theme_input=theme)
-
-        # Get and parse result
-        result = crew.kickoff()
-        album_data = parse_crew_result(result)
-        
-        # Generate album with presigned URLs
-        album_with_urls = await generate_album_with_presigned_urls(album_data)
-        return JSONResponse(content=album_with_urls)
+        job_id = await album_generation_queue.submit(
+            theme=theme,
+            uploaded_image_path=uploaded_image_path,
+            mode=mode or ALBUM_MODE,
+        )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "message": "Album generation started",
+                "job_id": job_id,
+                "queue_depth": album_generation_queue.depth(),
+            },
+        )
 
+    except HTTPException:
+        raise
+    except AlbumQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating album: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/all-photos")
-async def get_all_photos_route(skip: int = 0, limit: int = 100):
-    photos = await get_all_photos(skip, limit)
-    return {"photos": photos}
+async def get_all_photos_route(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    size: str = Query("original", pattern=IMAGE_SIZE_PATTERN),
+):
+    try:
+        photos, next_cursor = await get_all_photos(skip, limit, cursor, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"photos": photos, "next_cursor": next_cursor}
 
 
 @app.get("/recent-photos")
-async def get_recent_photos_route(limit: int = 4):
+async def get_recent_photos_route(
+    limit: int = 4, size: str = Query("original", pattern=IMAGE_SIZE_PATTERN)
+):
     try:
-        photos = await get_recent_photos(limit)
+        photos = await get_recent_photos(limit, size)
         return {"photos": photos}
     except Exception as e:
         print(f"Error fetching recent photos: {str(e)}")
@@ -321,25 +454,39 @@ async def get_recent_photos_route(limit: int = 4):
 
 
 @app.get("/all-albums")
-async def get_all_albums_route(skip: int = 0, limit: int = 100):
+async def get_all_albums_route(
+    skip: int = 0,
+    limit: int = 100,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    cursor: Optional[str] = None,
+    size: str = Query("original", pattern=IMAGE_SIZE_PATTERN),
+):
     try:
-        albums = await get_all_albums(skip, limit)
+        albums, next_cursor = await get_all_albums(
+            skip, limit, summary=view == "summary", cursor=cursor, size=size
+        )
         for album in albums:
-            if "images" not in album or not album["images"]:
+            if not album.get("images") and not album.get("image_count"):
                 logger.warning(f"Album {album['id']} has no images")
-        return {"albums": albums}
+        return {"albums": albums, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error fetching all albums: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/recent-albums")
-async def get_recent_albums_route(limit: int = 4):
+async def get_recent_albums_route(
+    limit: int = 4,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    size: str = Query("original", pattern=IMAGE_SIZE_PATTERN),
+):
     try:
-        albums = await get_recent_albums(limit)
+        albums = await get_recent_albums(limit, summary=view == "summary", size=size)
         # Format consistently with all-albums
         for album in albums:
-            if "images" not in album or not album["images"]:
+            if not album.get("images") and not album.get("image_count"):
                 logger.warning(f"Album {album['id']} has no images")
         return {"albums": albums}
     except Exception as e:
@@ -348,10 +495,12 @@ async def get_recent_albums_route(limit: int = 4):
 
 
 @app.get("/albums/{album_id}")
-async def get_album(album_id: str):
+async def get_album(
+    album_id: str, size: str = Query("original", pattern=IMAGE_SIZE_PATTERN)
+):
     logger.debug(f"Received request for album ID: {album_id}")
     try:
-        album = await get_album_by_id(album_id)
+        album = await get_album_by_id(album_id, size)
         if album is None:
             raise HTTPException(status_code=404, detail="Album not found")
         return album
@@ -361,34 +510,146 @@ async def get_album(album_id: str):
 
 
 @app.post("/generate-video/{album_id}")
-async def generate_video(album_id: str, background_tasks: BackgroundTasks):
+async def generate_video(album_id: str, request: Optional[VideoRenderRequest] = None):
+    request = request or VideoRenderRequest()
     album = await get_album_by_id(album_id)
     if not album:
         raise HTTPException(status_code=404, detail="Album not found")
 
-    background_tasks.add_task(create_video, album)
-    return {"message": "Video generation started", "album_id": album_id}
+    settings = {
+        **VIDEO_PROFILES["full"],
+        **request.model_dump(exclude={"preview"}),
+    }
+    cached_video_url = await find_cached_video(album, settings)
+    if cached_video_url:
+        return {
+            "message": "Video is up to date",
+            "album_id": album_id,
+            "job_id": None,
+            "video_url": album["video_url"],
+        }
+
+    preview_settings = None
+    if request.preview:
+        preview_settings = {
+            **VIDEO_PROFILES["preview"],
+            "seconds_per_image": settings["seconds_per_image"],
+        }
+    job_id = await video_render_queue.submit(album, settings, preview_settings)
+    return {"message": "Video generation started", "album_id": album_id, "job_id": job_id}
+
+
+@app.get("/video-jobs/{job_id}")
+async def get_video_job(job_id: str):
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    return {"job_id": job_id, **job, "queue_depth": video_render_queue.depth()}
+
+
+@app.post("/generate-albums")
+async def generate_albums(request: BatchAlbumRequest):
+    """Queue one album per theme, built from a single batched search."""
+    themes = [theme.strip() for theme in request.themes if theme.strip()]
+    if not themes:
+        raise HTTPException(status_code=400, detail="At least one theme is required")
+    try:
+        job_id = await album_generation_queue.submit_batch(
+            themes, dedupe=request.dedupe, images_per_album=request.images_per_album
+        )
+    except AlbumQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Album generation started",
+            "job_id": job_id,
+            "queue_depth": album_generation_queue.depth(),
+        },
+    )
+
+
+@app.get("/album-jobs/{job_id}")
+async def get_album_job(
+    job_id: str, size: str = Query("original", pattern=IMAGE_SIZE_PATTERN)
+):
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Album job not found")
+
+    albums = []
+    if job["status"] == "COMPLETED":
+        albums = await asyncio.gather(
+            *(
+                get_album_by_id(album_id, size=size)
+                for album_id in job.get("details", {}).get("album_ids", [])
+            )
+        )
+        # Albums deleted since the job finished come back as None
+        albums = [album for album in albums if album]
+    return {
+        "job_id": job_id,
+        **job,
+        "album": albums[0] if albums else None,
+        "albums": albums,
+        "queue_depth": album_generation_queue.depth(),
+    }
+
+
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", 0.5))
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, after: int = Query(0, ge=0)):
+    """
+    Stream a job's events as server-sent events.
+
+    Each event carries its sequence number as the SSE id, so a client can
+    reconnect with ?after=<last id>. The stream ends once the job reaches a
+    terminal status or is evicted from the job store.
+    """
+    if await asyncio.to_thread(get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_seq = after
+        while True:
+            snapshot = await asyncio.to_thread(events_since, job_id, last_seq)
+            if snapshot is None:
+                yield "event: end\ndata: {\"status\": \"EXPIRED\"}\n\n"
+                return
+            status, events = snapshot
+            for event in events:
+                last_seq = event["seq"]
+                payload = {
+                    "timestamp": event["timestamp"].isoformat(),
+                    "data": event["data"],
+                }
+                yield f"id: {last_seq}\ndata: {json.dumps(payload)}\n\n"
+            if status in TERMINAL_STATUSES:
+                yield f"event: end\ndata: {json.dumps({'status': status})}\n\n"
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @app.get("/download-video/{album_id}")
 async def get_video_download_url(album_id: str):
     try:
-        album = await get_album_by_id(album_id)
-        if not album or not album.get("video_url"):
+        # Only the full-quality render is offered for download, never a preview
+        s3_key = await get_album_video_key(album_id)
+        if not s3_key:
             raise HTTPException(status_code=404, detail="Video not found")
 
-        # Extract the S3 key from the stored URL
-        video_filename = album["video_url"].split("/")[-1].split("?")[0]
-
-        # Prepend the folder name (generated-video) to the video filename
-        s3_key = f"generated-video/{video_filename}"
-
         # Generate a new presigned URL for downloading
         download_url = generate_presigned_url(
             s3_key, expiration=3600, for_frontend=True, as_attachment=True
         )
 
         return {"download_url": download_url}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating download URL for album {album_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -397,6 +658,7 @@ async def get_video_download_url(album_id: str):
 @app.delete("/photos/{image_id}")
 async def delete_photo_route(image_id: str):
     result = await delete_multiple_photos([image_id])
+    duplicate_detector.forget(result["successful"])
     if result["successful"]:
         return {"message": f"Photo {image_id} deleted successfully"}
     else:
@@ -420,6 +682,7 @@ async def delete_album_route(album_id: str):
 async def bulk_delete_photos(request: BulkDeletePhotosRequest):
     try:
         result = await delete_multiple_photos(request.photo_ids)
+        duplicate_detector.forget(result["successful"])
         return {
             "message": f"Deleted {len(result['successful'])} photos successfully",
             "successful": result["successful"],
@@ -454,14 +717,12 @@ async def bulk_delete_albums(request: BulkDeleteAlbumsRequest):
 @app.get("/qdrant-data")
 async def get_all_qdrant_data() -> List[Dict[str, Any]]:
     try:
-        qdrant_client = QdrantClient("localhost", port=6333)
-
         all_data = []
         offset = None
         limit = 100  # Number of records to fetch per request
 
         while True:
-            results = qdrant_client.scroll(
+            results = await async_qdrant_client.scroll(
                 collection_name="family_book_images",
                 limit=limit,
                 offset=offset,
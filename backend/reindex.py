@@ -0,0 +1,222 @@
+"""
+Rebuild the family_book_images Qdrant collection from the Mongo images collection.
+
+Usage:
+    python reindex.py [--batch-size 32] [--concurrency 8] [--checkpoint reindex_checkpoint.json]
+                      [--restart] [--recreate]
+
+Image documents are streamed in _id order, originals are fetched from S3 with a
+bounded pool, embedded in batches and upserted in bulk. After every batch the
+last processed _id is written to the checkpoint file, so an interrupted run
+picks up where it stopped unless --restart is given.
+"""
+
+import argparse
+import asyncio
+from io import BytesIO
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from db import (
+    async_qdrant_client,
+    close_clients,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_collection,
+    read_s3_object,
+    run_in_s3_executor,
+    sync_album_membership,
+)
+from duplicates import format_hash
+from ingest import analyze_image_files, index_images
+from tools import (
+    collection_create_kwargs,
+    collection_name,
+    ensure_payload_indexes,
+    ensure_qdrant_collection,
+    image_payload,
+)
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_id": None, "processed": 0, "failed": []}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+async def fetch_originals(
+    docs: List[Dict[str, Any]], semaphore: asyncio.Semaphore
+) -> List[Optional[BytesIO]]:
+    async def fetch(doc):
+        async with semaphore:
+            try:
+                return await run_in_s3_executor(
+                    read_s3_object, doc["metadata"]["s3_object_name"]
+                )
+            except Exception as e:
+                logger.error(f"Error fetching image {doc['_id']} from S3: {str(e)}")
+                return None
+
+    return await asyncio.gather(*(fetch(doc) for doc in docs))
+
+
+async def reindex_batch(
+    docs: List[Dict[str, Any]], semaphore: asyncio.Semaphore
+) -> List[str]:
+    """Embed and upsert one batch of image documents. Returns the failed IDs."""
+    originals = await fetch_originals(docs, semaphore)
+    fetched = [(doc, data) for doc, data in zip(docs, originals) if data is not None]
+    failed = [doc["_id"] for doc, data in zip(docs, originals) if data is None]
+
+    analyzed = await asyncio.to_thread(
+        analyze_image_files, [data for _, data in fetched]
+    )
+    embedded = [
+        (doc, result) for (doc, _), result in zip(fetched, analyzed) if result is not None
+    ]
+    failed += [doc["_id"] for (doc, _), result in zip(fetched, analyzed) if result is None]
+
+    if embedded:
+        await index_images(
+            async_qdrant_client,
+            [doc["_id"] for doc, _ in embedded],
+            [embedding for _, (_, embedding, _, _) in embedded],
+            [
+                image_payload(
+                    doc["_id"],
+                    doc["metadata"].get("original_filename"),
+                    captured_at,
+                    doc.get("created_at"),
+                )
+                for doc, (_, _, captured_at, _) in embedded
+            ],
+        )
+        await sync_album_membership([doc["_id"] for doc, _ in embedded])
+        # Keep the near-duplicate hash index and capture dates complete
+        await get_collection("images").bulk_write(
+            [
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {
+                            "metadata.phash": format_hash(phash),
+                            "metadata.captured_at": captured_at,
+                        }
+                    },
+                )
+                for doc, (_, _, captured_at, phash) in embedded
+            ],
+            ordered=False,
+        )
+    return failed
+
+
+async def reindex(
+    batch_size: int, concurrency: int, checkpoint_path: str, restart: bool, recreate: bool
+):
+    await connect_to_mongo()
+    if recreate:
+        logger.info(f"Recreating collection {collection_name}")
+        await async_qdrant_client.recreate_collection(**collection_create_kwargs())
+        await asyncio.to_thread(ensure_payload_indexes)
+        restart = True
+    else:
+        await asyncio.to_thread(ensure_qdrant_collection)
+
+    checkpoint = (
+        {"last_id": None, "processed": 0, "failed": []}
+        if restart
+        else load_checkpoint(checkpoint_path)
+    )
+    if checkpoint["last_id"]:
+        logger.info(
+            f"Resuming after image {checkpoint['last_id']} "
+            f"({checkpoint['processed']} already processed)"
+        )
+
+    query = {"_id": {"$gt": checkpoint["last_id"]}} if checkpoint["last_id"] else {}
+    images_collection = get_collection("images")
+    total = await images_collection.count_documents(query)
+    cursor = images_collection.find(
+        query,
+        {"metadata.s3_object_name": 1, "metadata.original_filename": 1, "created_at": 1},
+    ).sort("_id", 1)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    done = 0
+    batch = []
+
+    async def flush():
+        nonlocal done
+        failed = await reindex_batch(batch, semaphore)
+        done += len(batch)
+        checkpoint["last_id"] = batch[-1]["_id"]
+        checkpoint["processed"] += len(batch) - len(failed)
+        checkpoint["failed"] += failed
+        save_checkpoint(checkpoint_path, checkpoint)
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        logger.info(
+            f"Reindexed {done}/{total} images ({rate:.1f} images/s, "
+            f"{len(checkpoint['failed'])} failed)"
+        )
+        batch.clear()
+
+    async for doc in cursor:
+        if "metadata" not in doc or "s3_object_name" not in doc["metadata"]:
+            checkpoint["failed"].append(doc["_id"])
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Reindex complete: {done} images in {elapsed:.1f}s "
+        f"({done / max(elapsed, 1e-9):.1f} images/s), "
+        f"{len(checkpoint['failed'])} failed"
+    )
+    await close_clients()
+    await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--checkpoint", default="reindex_checkpoint.json")
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore any existing checkpoint"
+    )
+    parser.add_argument(
+        "--recreate",
+        action="store_true",
+        help="Drop and recreate the Qdrant collection before reindexing",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        reindex(
+            args.batch_size, args.concurrency, args.checkpoint, args.restart, args.recreate
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
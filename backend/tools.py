@@ -1,16 +1,42 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
 from io import BytesIO
+import json
 import os
-from typing import Any, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional
 from PIL import Image
 from pydantic import BaseModel, Field
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, Batch
+from qdrant_client.http.models import (
+    Batch,
+    CollectionParamsDiff,
+    DatetimeRange,
+    Disabled,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
+    VectorParams,
+    VectorParamsDiff,
+)
+from botocore.exceptions import BotoCoreError, ClientError
 from langchain.tools import BaseTool
-import requests
 import torch
 from transformers import CLIPProcessor, CLIPModel
 
-from db import generate_presigned_url
+from db import S3Config
 from utils.log_config import setup_logger
 
 
@@ -24,50 +50,434 @@ qdrant_client = QdrantClient(
 )
 collection_name = "family_book_images"
 
+CLIP_MODEL_NAME = os.getenv("CLIP_MODEL_NAME", "openai/clip-vit-base-patch32")
 
-def ensure_qdrant_collection():
-    logger.info("ensure_qdrant_collection() function called")
-    try:
-        collection_info = qdrant_client.get_collection(collection_name)
-        if collection_info.config.params.vectors.size != 512:
+
+class ClipEmbeddingEngine:
+    """
+    Process-wide CLIP model shared by every tool.
+
+    The model and processor are loaded lazily on first use and reused for the
+    lifetime of the process. Inference is serialized with a lock so the engine
+    can be called from worker threads safely.
+    """
+
+    def __init__(self, model_name: str = CLIP_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._processor = None
+        self._load_lock = threading.Lock()
+        self._inference_lock = threading.Lock()
+        self.metrics: Dict[str, Any] = {
+            "loaded": False,
+            "load_seconds": None,
+            "load_count": 0,
+            "image_batches": 0,
+            "images_embedded": 0,
+            "text_batches": 0,
+            "texts_embedded": 0,
+        }
+
+    def _ensure_loaded(self):
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            logger.info(f"Loading CLIP model {self.model_name}")
+            start = time.perf_counter()
+            processor = CLIPProcessor.from_pretrained(self.model_name)
+            model = CLIPModel.from_pretrained(self.model_name)
+            model.eval()
+            self._processor = processor
+            self._model = model
+            elapsed = time.perf_counter() - start
+            self.metrics["loaded"] = True
+            self.metrics["load_seconds"] = round(elapsed, 3)
+            self.metrics["load_count"] += 1
+            logger.info(f"CLIP model {self.model_name} loaded in {elapsed:.2f}s")
+
+    @property
+    def model(self):
+        self._ensure_loaded()
+        return self._model
+
+    @property
+    def processor(self):
+        self._ensure_loaded()
+        return self._processor
+
+    def embed_images(self, images: List[Image.Image]) -> List[List[float]]:
+        """Return one image embedding per PIL image, in input order."""
+        if not images:
+            return []
+        self._ensure_loaded()
+        with self._inference_lock:
+            inputs = self._processor(images=images, return_tensors="pt")
+            with torch.no_grad():
+                embeddings = self._model.get_image_features(**inputs).numpy().tolist()
+            self.metrics["image_batches"] += 1
+            self.metrics["images_embedded"] += len(images)
+        return embeddings
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Return one text embedding per query string, in input order."""
+        if not texts:
+            return []
+        self._ensure_loaded()
+        with self._inference_lock:
+            inputs = self._processor(text=texts, return_tensors="pt", padding=True)
+            with torch.no_grad():
+                embeddings = self._model.get_text_features(**inputs).numpy().tolist()
+            self.metrics["text_batches"] += 1
+            self.metrics["texts_embedded"] += len(texts)
+        return embeddings
+
+
+embedding_engine = ClipEmbeddingEngine()
+
+
+def get_embedding_engine() -> ClipEmbeddingEngine:
+    return embedding_engine
+
+
+def normalize_text_query(text: str) -> str:
+    """Collapse case and whitespace so trivially different themes share a cache entry."""
+    return " ".join(text.lower().split())
+
+
+class TextEmbeddingCache:
+    """
+    Bounded LRU cache of CLIP text embeddings keyed by normalized query.
+
+    If persist_path is set, new entries are appended to a JSON-lines file
+    that is replayed on startup, so the cache survives restarts.
+    """
+
+    def __init__(self, max_size: int = 2048, persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            line_count = 0
+            with open(self.persist_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries[entry["query"]] = entry["embedding"]
+                    self._entries.move_to_end(entry["query"])
+                    line_count += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            # Compact the append-only file once it is mostly stale lines
+            if line_count > 2 * self.max_size:
+                self._append(self._entries, mode="w")
             logger.info(
-                f"Recreating collection {collection_name} with correct vector size"
-            )
-            qdrant_client.recreate_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=512, distance=Distance.COSINE),
+                f"Loaded {len(self._entries)} cached text embeddings from {self.persist_path}"
             )
-            logger.info(f"Collection {collection_name} checked/created successfully")
+        except Exception as e:
+            logger.error(f"Error loading text embedding cache: {str(e)}")
+
+    def _append(self, entries: Dict[str, List[float]], mode: str = "a"):
+        if not self.persist_path:
+            return
+        try:
+            with open(self.persist_path, mode) as f:
+                for key, embedding in entries.items():
+                    f.write(json.dumps({"query": key, "embedding": embedding}) + "\n")
+        except Exception as e:
+            logger.error(f"Error saving text embedding cache: {str(e)}")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put_many(self, entries: Dict[str, List[float]]):
+        with self._lock:
+            for key, embedding in entries.items():
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._append(entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+text_embedding_cache = TextEmbeddingCache(
+    max_size=int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", 2048)),
+    persist_path=os.getenv("TEXT_EMBEDDING_CACHE_PATH"),
+)
+
+
+def embed_text_queries(queries: List[str]) -> List[List[float]]:
+    """
+    Embed text queries, running one CLIP forward pass for all cache misses.
+
+    Returns one embedding per query, in input order.
+    """
+    keys = [normalize_text_query(query) for query in queries]
+    embeddings = {}
+    missing = []
+    for key in keys:
+        if key in embeddings or key in missing:
+            continue
+        cached = text_embedding_cache.get(key)
+        if cached is None:
+            missing.append(key)
         else:
-            logger.info(
-                f"Collection {collection_name} already exists with correct configuration"
-            )
+            embeddings[key] = cached
+
+    if missing:
+        computed = dict(zip(missing, embedding_engine.embed_texts(missing)))
+        text_embedding_cache.put_many(computed)
+        embeddings.update(computed)
+
+    return [embeddings[key] for key in keys]
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+# Index tuning, applied by ensure_qdrant_collection without recreating the collection
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 100))
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", 128))
+# "int8" keeps an int8 copy of every vector in RAM for search, "none" disables it
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+QDRANT_QUANTIZATION_QUANTILE = float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", 0.99))
+QDRANT_RESCORE = env_flag("QDRANT_RESCORE", True)
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", 2.0))
+QDRANT_VECTORS_ON_DISK = env_flag("QDRANT_VECTORS_ON_DISK")
+QDRANT_PAYLOAD_ON_DISK = env_flag("QDRANT_PAYLOAD_ON_DISK")
+
+
+def collection_vectors_config() -> VectorParams:
+    return VectorParams(
+        size=512, distance=Distance.COSINE, on_disk=QDRANT_VECTORS_ON_DISK
+    )
+
+
+def collection_hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def collection_quantization_config() -> Optional[ScalarQuantization]:
+    if QDRANT_QUANTIZATION != "int8":
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=QDRANT_QUANTIZATION_QUANTILE,
+            always_ram=True,
+        )
+    )
+
+
+def collection_create_kwargs() -> Dict[str, Any]:
+    """Arguments for create_collection/recreate_collection with the configured tuning."""
+    return {
+        "collection_name": collection_name,
+        "vectors_config": collection_vectors_config(),
+        "hnsw_config": collection_hnsw_config(),
+        "quantization_config": collection_quantization_config(),
+        "on_disk_payload": QDRANT_PAYLOAD_ON_DISK,
+    }
+
+
+def search_params() -> SearchParams:
+    """Search-time HNSW ef, plus rescoring against the originals when quantized."""
+    quantization = None
+    if QDRANT_QUANTIZATION == "int8":
+        quantization = QuantizationSearchParams(
+            rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING
+        )
+    return SearchParams(hnsw_ef=QDRANT_SEARCH_EF, quantization=quantization)
+
+
+def collection_config_changes(collection_info) -> Dict[str, Any]:
+    """
+    Compare an existing collection with the configured tuning.
+
+    Returns the update_collection arguments needed to migrate it, empty if the
+    collection already matches.
+    """
+    config = collection_info.config
+    changes: Dict[str, Any] = {}
+
+    if bool(config.params.vectors.on_disk) != QDRANT_VECTORS_ON_DISK:
+        changes["vectors_config"] = {"": VectorParamsDiff(on_disk=QDRANT_VECTORS_ON_DISK)}
+    if bool(config.params.on_disk_payload) != QDRANT_PAYLOAD_ON_DISK:
+        changes["collection_params"] = CollectionParamsDiff(
+            on_disk_payload=QDRANT_PAYLOAD_ON_DISK
+        )
+    if (
+        config.hnsw_config.m != QDRANT_HNSW_M
+        or config.hnsw_config.ef_construct != QDRANT_HNSW_EF_CONSTRUCT
+    ):
+        changes["hnsw_config"] = collection_hnsw_config()
+
+    current = config.quantization_config
+    desired = collection_quantization_config()
+    if desired is None and current is not None:
+        changes["quantization_config"] = Disabled.DISABLED
+    elif desired is not None and (
+        not isinstance(current, ScalarQuantization)
+        or current.scalar.type != ScalarType.INT8
+        or current.scalar.quantile != QDRANT_QUANTIZATION_QUANTILE
+    ):
+        changes["quantization_config"] = desired
+    return changes
+
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def read_capture_date(image: Image.Image) -> Optional[datetime]:
+    """Return when the photo was taken according to its EXIF data, if recorded."""
+    try:
+        exif = image.getexif()
+        value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(
+            EXIF_DATETIME
+        )
+        if not value:
+            return None
+        return datetime.strptime(str(value).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
     except Exception as e:
-        logger.error(f"Error checking collection: {str(e)}")
-        logger.info(f"Attempting to create collection {collection_name}")
-        try:
-            qdrant_client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=512, distance=Distance.COSINE),
+        logger.debug(f"No usable EXIF capture date: {str(e)}")
+        return None
+
+
+# Payload fields written for every image point and indexed so that filtered
+# searches are resolved inside the HNSW traversal instead of by post-filtering.
+PAYLOAD_INDEXES = {
+    "image_id": PayloadSchemaType.KEYWORD,
+    "captured_at": PayloadSchemaType.DATETIME,
+    "uploaded_at": PayloadSchemaType.DATETIME,
+    "album_ids": PayloadSchemaType.KEYWORD,
+}
+
+
+def image_payload(
+    image_id: str,
+    filename: Optional[str],
+    captured_at: Optional[datetime] = None,
+    uploaded_at: Optional[datetime] = None,
+    album_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Build the Qdrant payload for an image point."""
+    return {
+        "image_id": image_id,
+        "filename": filename,
+        "captured_at": captured_at.isoformat() if captured_at else None,
+        "uploaded_at": (uploaded_at or datetime.now(timezone.utc)).isoformat(),
+        "album_ids": list(album_ids or []),
+    }
+
+
+def build_search_filter(
+    captured_after: Optional[datetime] = None,
+    captured_before: Optional[datetime] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+    album_id: Optional[str] = None,
+    not_in_album: bool = False,
+) -> Optional[Filter]:
+    """
+    Translate retrieval filters into a Qdrant filter on the indexed payload fields.
+
+    Date bounds are inclusive on the "after" side and exclusive on the "before"
+    side. Returns None when no filter is requested.
+    """
+    must: List[Any] = []
+    if captured_after or captured_before:
+        must.append(
+            FieldCondition(
+                key="captured_at",
+                range=DatetimeRange(gte=captured_after, lt=captured_before),
             )
-            logger.info(f"Collection {collection_name} created successfully")
-        except Exception as create_error:
-            logger.error(f"Failed to create collection: {str(create_error)}")
-            raise
+        )
+    if uploaded_after or uploaded_before:
+        must.append(
+            FieldCondition(
+                key="uploaded_at",
+                range=DatetimeRange(gte=uploaded_after, lt=uploaded_before),
+            )
+        )
+    if album_id:
+        must.append(FieldCondition(key="album_ids", match=MatchValue(value=album_id)))
+    if not_in_album:
+        must.append(IsEmptyCondition(is_empty=PayloadField(key="album_ids")))
+    return Filter(must=must) if must else None
 
 
-try:
+def ensure_payload_indexes(existing_schema: Optional[Dict[str, Any]] = None):
+    """Create any payload index from PAYLOAD_INDEXES that the collection lacks."""
+    existing_schema = existing_schema or {}
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in existing_schema:
+            continue
+        logger.info(f"Creating payload index {field_name} ({schema}) on {collection_name}")
+        qdrant_client.create_payload_index(
+            collection_name=collection_name, field_name=field_name, field_schema=schema
+        )
+
+
+def ensure_qdrant_collection():
+    """
+    Create the collection, or migrate an existing one to the configured tuning.
+
+    Existing collections are updated in place with update_collection; Qdrant
+    rebuilds the index and quantized vectors in the background while the
+    collection keeps serving reads. A collection whose vector size does not
+    match is never dropped here: rebuild it with `python reindex.py --recreate`.
+    """
+    logger.info("ensure_qdrant_collection() function called")
+    if not qdrant_client.collection_exists(collection_name):
+        logger.info(f"Creating collection {collection_name}")
+        qdrant_client.create_collection(**collection_create_kwargs())
+        ensure_payload_indexes()
+        logger.info(f"Collection {collection_name} created successfully")
+        return
+
     collection_info = qdrant_client.get_collection(collection_name)
     if collection_info.config.params.vectors.size != 512:
-        qdrant_client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=512, distance=Distance.COSINE),
+        raise RuntimeError(
+            f"Collection {collection_name} has vector size "
+            f"{collection_info.config.params.vectors.size}, expected 512. "
+            "Run `python reindex.py --recreate` to rebuild it."
         )
-except Exception:
-    qdrant_client.create_collection(
-        collection_name=collection_name,
-        vectors_config=VectorParams(size=512, distance=Distance.COSINE),
-    )
+
+    ensure_payload_indexes(collection_info.payload_schema)
+
+    changes = collection_config_changes(collection_info)
+    if not changes:
+        logger.info(
+            f"Collection {collection_name} already exists with correct configuration"
+        )
+        return
+
+    logger.info(f"Migrating collection {collection_name}: {sorted(changes)}")
+    qdrant_client.update_collection(collection_name=collection_name, **changes)
+    logger.info(f"Collection {collection_name} migrated successfully")
 
 
 class ImageUploadInput(BaseModel):
@@ -82,34 +492,27 @@ class ImageUploadTool(BaseTool):
     qdrant_client: QdrantClient = Field(
         description="Qdrant client for vector operations"
     )
-    model: Any = Field(default=None, description="CLIP model for image processing")
-    processor: Any = Field(
-        default=None, description="CLIP processor for image preprocessing"
-    )
+    engine: Any = Field(default=None, description="Shared CLIP embedding engine")
 
     def __init__(self, qdrant_client):
         super().__init__()
         self.qdrant_client = qdrant_client
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+        self.engine = get_embedding_engine()
 
     def _run(self, filename: str, image_id: str) -> str:
         try:
             with Image.open(filename) as image:
-                # Process the image
-                inputs = self.processor(images=image, return_tensors="pt")
-                with torch.no_grad():
-                    image_embedding = (
-                        self.model.get_image_features(**inputs).numpy().tolist()
-                    )
-
-            # Store the embedding in Qdrant
+                captured_at = read_capture_date(image)
+                image_embedding = self.engine.embed_images([image])
+
+            # Store the embedding in Qdrant. The file is a temp copy, so its
+            # name says nothing about the photo and is not stored.
             self.qdrant_client.upsert(
                 collection_name="family_book_images",
                 points=Batch(
                     ids=[image_id],
                     vectors=image_embedding,
-                    payloads=[{"image_id": image_id, "filename": filename}],
+                    payloads=[image_payload(image_id, None, captured_at)],
                 ),
             )
 
@@ -120,112 +523,216 @@ class ImageUploadTool(BaseTool):
 
 class ImageRetrievalInput(BaseModel):
     text_query: str = Field(None, description="Text description for image retrieval")
+    text_queries: List[str] = Field(
+        None, description="Several text descriptions to retrieve images for at once"
+    )
     uploaded_image_path: str = Field(
         None, description="Path to image file for image-based retrieval"
     )
+    captured_after: datetime = Field(
+        None, description="Only photos taken on or after this date (ISO 8601)"
+    )
+    captured_before: datetime = Field(
+        None, description="Only photos taken before this date (ISO 8601)"
+    )
+    uploaded_after: datetime = Field(
+        None, description="Only photos uploaded on or after this date (ISO 8601)"
+    )
+    uploaded_before: datetime = Field(
+        None, description="Only photos uploaded before this date (ISO 8601)"
+    )
+    album_id: str = Field(None, description="Only photos in this album")
+    not_in_album: bool = Field(
+        False, description="Only photos that are not in any album yet"
+    )
+
+
+
+def extract_s3_key(url: str) -> str:
+    """Extract the S3 key from a MinIO URL."""
+    try:
+        # If it's a full URL (starts with http)
+        if url.startswith('http'):
+            # Just take everything after 'family-photos/'
+            parts = url.split('family-photos/')
+            if len(parts) > 1:
+                return parts[1].split('?')[0]
+        
+        # If it's just a path
+        elif url.startswith('generated-album/'):
+            return url
+            
+        logger.debug(f"Extracted key: {url}")
+        return url
+        
+    except Exception as e:
+        logger.error(f"Error extracting S3 key from {url}: {e}")
+        return url
+
+
+def search_images(
+    qdrant_client: QdrantClient,
+    text_queries: Optional[List[str]] = None,
+    uploaded_image_path: Optional[str] = None,
+    engine: Optional[ClipEmbeddingEngine] = None,
+    limit: int = 10,
+    query_filter: Optional[Filter] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Find the images most similar to the text queries or the uploaded image.
 
+    Each query vector is searched separately and the best score per image is
+    kept. query_filter (see build_search_filter) is applied by Qdrant during
+    the search. Returns up to limit hits as {"image_id", "score", "filename"}
+    dicts, best first.
+    """
+    engine = engine or get_embedding_engine()
+    try:
+        if text_queries:
+            logger.info(f"Processing text queries: {text_queries}")
+            embeddings = embed_text_queries(text_queries)
+            score_threshold = 0.2
+        elif uploaded_image_path:
+            logger.info(f"Processing image from URL: {uploaded_image_path}")
+            s3_key = extract_s3_key(uploaded_image_path)
+            logger.info(f"Extracted S3 key: {s3_key}")
+
+            # Read the object straight from S3 instead of over a presigned URL
+            response = S3Config.client.get_object(
+                Bucket=S3Config.get_bucket_name(), Key=s3_key
+            )
+            image = Image.open(BytesIO(response["Body"].read()))
+            embeddings = engine.embed_images([image])
+            score_threshold = 0.6
+        else:
+            raise ValueError(
+                "Either text_query or uploaded_image_path must be provided"
+            )
+
+        # Keep the best score per image across all query vectors
+        best_hits: Dict[str, Dict[str, Any]] = {}
+        for embedding in embeddings:
+            search_results = qdrant_client.search(
+                collection_name=collection_name,
+                query_vector=embedding,
+                limit=20,
+                score_threshold=score_threshold,
+                query_filter=query_filter,
+                search_params=search_params(),
+            )
+
+            for result in search_results:
+                image_id = result.payload["image_id"]
+                logger.info(f"Image ID: {image_id}, Score: {result.score}")
+                best = best_hits.get(image_id)
+                if best is None or result.score > best["score"]:
+                    best_hits[image_id] = {
+                        "image_id": image_id,
+                        "score": result.score,
+                        "filename": result.payload.get("filename"),
+                    }
+
+        filtered_results = sorted(
+            (hit for hit in best_hits.values() if hit["score"] > score_threshold),
+            key=lambda hit: hit["score"],
+            reverse=True,
+        )
+        return filtered_results[:limit]
+    except (BotoCoreError, ClientError) as e:
+        logger.error(f"Error downloading image: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error in image retrieval: {str(e)}")
+        raise
+
+
+def search_themes(
+    qdrant_client: QdrantClient,
+    themes: List[str],
+    limit: int = 10,
+    query_filter: Optional[Filter] = None,
+    score_threshold: float = 0.2,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Search several text themes at once.
+
+    All themes are embedded in one CLIP forward pass (cache misses only) and
+    searched with a single search_batch request. Returns one list of
+    {"image_id", "score", "filename"} hits per theme, best first.
+    """
+    embeddings = embed_text_queries(themes)
+    responses = qdrant_client.search_batch(
+        collection_name=collection_name,
+        requests=[
+            SearchRequest(
+                vector=embedding,
+                limit=limit,
+                score_threshold=score_threshold,
+                filter=query_filter,
+                params=search_params(),
+                with_payload=True,
+            )
+            for embedding in embeddings
+        ],
+    )
+    return [
+        [
+            {
+                "image_id": point.payload["image_id"],
+                "score": point.score,
+                "filename": point.payload.get("filename"),
+            }
+            for point in points
+        ]
+        for points in responses
+    ]
 
 
 class ImageRetrievalTool(BaseTool):
     name: str = "image_retrieval"
     description: str = (
-        "Retrieves similar images based on text descriptions or image input"
+        "Retrieves similar images based on text descriptions or image input, "
+        "optionally limited by capture date, upload date or album membership"
     )
     args_schema: type[BaseModel] = ImageRetrievalInput
     qdrant_client: QdrantClient = Field(
         description="Qdrant client for vector operations"
     )
-    model: Any = Field(default=None, description="CLIP model for processing")
-    processor: Any = Field(default=None, description="CLIP processor for preprocessing")
+    engine: Any = Field(default=None, description="Shared CLIP embedding engine")
 
     def __init__(self, qdrant_client):
         super().__init__()
         self.qdrant_client = qdrant_client
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        ensure_qdrant_collection()
-
-    def _extract_s3_key(self, url: str) -> str:
-        """Extract the S3 key from a MinIO URL."""
-        try:
-            # If it's a full URL (starts with http)
-            if url.startswith('http'):
-                # Just take everything after 'family-photos/'
-                parts = url.split('family-photos/')
-                if len(parts) > 1:
-                    return parts[1].split('?')[0]
-            
-            # If it's just a path
-            elif url.startswith('generated-album/'):
-                return url
-                
-            logger.debug(f"Extracted key: {url}")
-            return url
-            
-        except Exception as e:
-            logger.error(f"Error extracting S3 key from {url}: {e}")
-            return url
+        self.engine = get_embedding_engine()
 
     def _run(
         self,
         text_query: Optional[str] = None,
         uploaded_image_path: Optional[str] = None,
+        text_queries: Optional[List[str]] = None,
+        captured_after: Optional[datetime] = None,
+        captured_before: Optional[datetime] = None,
+        uploaded_after: Optional[datetime] = None,
+        uploaded_before: Optional[datetime] = None,
+        album_id: Optional[str] = None,
+        not_in_album: bool = False,
     ) -> List[str]:
-        try:
-            if text_query:
-                logger.info(f"Processing text query: {text_query}")
-                inputs = self.processor(
-                    text=[text_query], return_tensors="pt", padding=True
-                )
-                with torch.no_grad():
-                    embedding = self.model.get_text_features(**inputs).numpy().tolist()
-                score_threshold = 0.2
-            elif uploaded_image_path:
-                logger.info(f"Processing image from URL: {uploaded_image_path}")
-                s3_key = self._extract_s3_key(uploaded_image_path)
-                logger.info(f"Extracted S3 key: {s3_key}")
-                
-                # Generate presigned URL for internal use (keep minio:9000)
-                presigned_url = generate_presigned_url(s3_key, for_frontend=False)
-                logger.info(f"Generated internal presigned URL for key: {s3_key}")
-                
-                response = requests.get(presigned_url)
-                response.raise_for_status()
-                image = Image.open(BytesIO(response.content))
-                inputs = self.processor(images=image, return_tensors="pt")
-                with torch.no_grad():
-                    embedding = self.model.get_image_features(**inputs).numpy().tolist()
-                score_threshold = 0.6
-            else:
-                raise ValueError(
-                    "Either text_query or uploaded_image_path must be provided"
-                )
-
-            search_results = self.qdrant_client.search(
-                collection_name="family_book_images",
-                query_vector=embedding[0],
-                limit=20,
-                score_threshold=score_threshold,
-            )
-
-            for result in search_results:
-                logger.info(
-                    f"Image ID: {result.payload['image_id']}, Score: {result.score}"
-                )
-
-            filtered_results = [
-                result.payload["image_id"]
-                for result in search_results
-                if result.score > score_threshold
-            ]
-
-            return filtered_results[:10]  # Return top 10 filtered results
-        except requests.RequestException as e:
-            logger.error(f"Error downloading image: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Error in image retrieval: {str(e)}")
-            raise
+        queries = ([text_query] if text_query else []) + list(text_queries or [])
+        hits = search_images(
+            self.qdrant_client,
+            text_queries=queries,
+            uploaded_image_path=uploaded_image_path,
+            engine=self.engine,
+            query_filter=build_search_filter(
+                captured_after=captured_after,
+                captured_before=captured_before,
+                uploaded_after=uploaded_after,
+                uploaded_before=uploaded_before,
+                album_id=album_id,
+                not_in_album=not_in_album,
+            ),
+        )
+        return [hit["image_id"] for hit in hits]
 
 
 def get_tools(qdrant_client):
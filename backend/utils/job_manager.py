@@ -1,20 +1,34 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Dict
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Iterable, List, Dict, Optional, Tuple
 from threading import Lock
 import logging
+import os
+import re
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-jobs_lock = Lock()
-jobs: Dict[str, "Job"] = {}
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 24 * 3600))
+JOB_MAX_JOBS = int(os.getenv("JOB_MAX_JOBS", 1000))
+JOB_MAX_EVENTS = int(os.getenv("JOB_MAX_EVENTS", 200))
+
+# Statuses after which a job receives no further events
+TERMINAL_STATUSES = ("COMPLETED", "UPLOADED", "FAILED")
+
+
+def utc_now() -> datetime:
+    """Timezone-aware current time; the Mongo TTL index expects UTC."""
+    return datetime.now(timezone.utc)
 
 
 @dataclass
 class Event:
+    seq: int
     timestamp: datetime
     data: str
 
@@ -22,15 +36,483 @@ class Event:
 @dataclass
 class Job:
     status: str
-    events: List[Event]
+    events: Deque[Event]
     result: str
+    created_at: datetime = field(default_factory=utc_now)
+    updated_at: datetime = field(default_factory=utc_now)
+    details: Dict[str, Any] = field(default_factory=dict)
+    event_count: int = 0
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+
+class JobStore(ABC):
+    """Interface shared by the job store backends."""
+
+    @abstractmethod
+    def append_event(self, job_id: str, event_data: Any):
+        ...
+
+    @abstractmethod
+    def create_job(
+        self,
+        job_id: str,
+        status: str,
+        owner: Optional[str] = None,
+        lease_seconds: int = 0,
+        **details,
+    ):
+        ...
+
+    @abstractmethod
+    def update_job(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        result: Optional[str] = None,
+        **details,
+    ):
+        ...
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def find_jobs(
+        self, statuses: Iterable[str], id_prefix: str = ""
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def claim_job(
+        self, job_id: str, statuses: Iterable[str], owner: str, lease_seconds: int
+    ) -> bool:
+        """
+        Take over a job in one of statuses whose lease is missing or expired.
+
+        :return: Whether owner now holds the job's lease
+        """
+
+    @abstractmethod
+    def renew_leases(
+        self, job_ids: Iterable[str], owner: str, lease_seconds: int
+    ) -> List[str]:
+        """Extend owner's leases on job_ids, returning the jobs it still holds."""
+
+    def events_since(
+        self, job_id: str, after_seq: int
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Return the job status and its events with seq > after_seq, or None."""
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        return job["status"], [e for e in job["events"] if e["seq"] > after_seq]
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Process-local job store.
+
+    Jobs expire ttl_seconds after their last update, at most max_jobs are
+    kept (least recently updated are evicted first), and each job keeps only
+    its last max_events events.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = JOB_TTL_SECONDS,
+        max_jobs: int = JOB_MAX_JOBS,
+        max_events: int = JOB_MAX_EVENTS,
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_jobs = max_jobs
+        self.max_events = max_events
+        self._lock = Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def _new_job(self, status: str, details: Dict[str, Any]) -> Job:
+        return Job(
+            status=status,
+            events=deque(maxlen=self.max_events),
+            result="",
+            details=details,
+        )
+
+    def _add_event(self, job: Job, data: Any):
+        job.event_count += 1
+        job.updated_at = utc_now()
+        job.events.append(
+            Event(seq=job.event_count, timestamp=job.updated_at, data=str(data))
+        )
+
+    def _touch(self, job_id: str):
+        self._jobs.move_to_end(job_id)
+        self._evict()
+
+    def _evict(self):
+        cutoff = utc_now() - self.ttl
+        while self._jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if len(self._jobs) <= self.max_jobs and oldest.updated_at >= cutoff:
+                break
+            logger.info("Evicting job %s", oldest_id)
+            del self._jobs[oldest_id]
+
+    def append_event(self, job_id: str, event_data: Any):
+        with self._lock:
+            if job_id not in self._jobs:
+                logger.info("Job %s started", job_id)
+                self._jobs[job_id] = self._new_job("STARTED", {})
+            else:
+                logger.info("Appending event for job %s: %s", job_id, event_data)
+            self._add_event(self._jobs[job_id], event_data)
+            self._touch(job_id)
+
+    def create_job(
+        self,
+        job_id: str,
+        status: str,
+        owner: Optional[str] = None,
+        lease_seconds: int = 0,
+        **details,
+    ):
+        with self._lock:
+            logger.info("Job %s created with status %s", job_id, status)
+            job = self._new_job(status, details)
+            if owner:
+                job.owner = owner
+                job.lease_expires_at = utc_now() + timedelta(seconds=lease_seconds)
+            self._add_event(job, status)
+            self._jobs[job_id] = job
+            self._touch(job_id)
+
+    def update_job(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        result: Optional[str] = None,
+        **details,
+    ):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                logger.warning("Update for unknown job %s", job_id)
+                return
+            job.updated_at = utc_now()
+            if status and status != job.status:
+                logger.info("Job %s: %s -> %s", job_id, job.status, status)
+                job.status = status
+                self._add_event(job, status)
+            if result is not None:
+                job.result = result
+            job.details.update(details)
+            self._touch(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.updated_at < utc_now() - self.ttl:
+                return None
+            return self._snapshot(job)
+
+    @staticmethod
+    def _snapshot(job: Job) -> Dict[str, Any]:
+        snapshot = asdict(job)
+        snapshot["events"] = [asdict(event) for event in job.events]
+        return snapshot
+
+    def find_jobs(
+        self, statuses: Iterable[str], id_prefix: str = ""
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        statuses = set(statuses)
+        with self._lock:
+            return [
+                (job_id, self._snapshot(job))
+                for job_id, job in self._jobs.items()
+                if job.status in statuses and job_id.startswith(id_prefix)
+            ]
+
+    def claim_job(
+        self, job_id: str, statuses: Iterable[str], owner: str, lease_seconds: int
+    ) -> bool:
+        now = utc_now()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in set(statuses):
+                return False
+            if job.lease_expires_at is not None and job.lease_expires_at >= now:
+                return False
+            job.owner = owner
+            job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            return True
+
+    def renew_leases(
+        self, job_ids: Iterable[str], owner: str, lease_seconds: int
+    ) -> List[str]:
+        expires_at = utc_now() + timedelta(seconds=lease_seconds)
+        held = []
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and job.owner == owner:
+                    job.lease_expires_at = expires_at
+                    held.append(job_id)
+        return held
+
+
+class MongoJobStore(JobStore):
+    """
+    Job store shared by every API and worker process through MongoDB.
+
+    Uses synchronous pymongo because events are appended from crew worker
+    threads. A TTL index on updated_at expires old jobs, the collection is
+    trimmed to max_jobs, and each job keeps only its last max_events events.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        ttl_seconds: int = JOB_TTL_SECONDS,
+        max_jobs: int = JOB_MAX_JOBS,
+        max_events: int = JOB_MAX_EVENTS,
+    ):
+        from pymongo import ASCENDING, MongoClient, ReturnDocument
+
+        self._return_after = ReturnDocument.AFTER
+        self.max_jobs = max_jobs
+        self.max_events = max_events
+        self.collection = MongoClient(uri).get_database("family_photo_album")["jobs"]
+        self.collection.create_index(
+            [("updated_at", ASCENDING)], expireAfterSeconds=ttl_seconds, name="job_ttl"
+        )
+
+    def _push_event(
+        self,
+        job_id: str,
+        data: Any,
+        extra_set: Dict[str, Any],
+        upsert: bool,
+        condition: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Apply extra_set and take the next event seq in one atomic update, then
+        push the event under that seq.
+
+        :param condition: Extra filter the job must match for the update to apply
+        :return: Whether the update applied
+        """
+        now = utc_now()
+        update = {"$inc": {"event_count": 1}, "$set": {"updated_at": now, **extra_set}}
+        if upsert:
+            # Fields in $setOnInsert may not overlap a $set path
+            defaults = {"status": "STARTED", "created_at": now, "result": "", "details": {}}
+            update["$setOnInsert"] = {
+                field: value
+                for field, value in defaults.items()
+                if not any(
+                    path == field or path.startswith(f"{field}.") for path in extra_set
+                )
+            }
+        doc = self.collection.find_one_and_update(
+            {"_id": job_id, **(condition or {})},
+            update,
+            upsert=upsert,
+            return_document=self._return_after,
+            projection={"event_count": 1},
+        )
+        if doc is None:
+            return False
+        self.collection.update_one(
+            {"_id": job_id},
+            {
+                "$push": {
+                    "events": {
+                        "$each": [
+                            {"seq": doc["event_count"], "timestamp": now, "data": str(data)}
+                        ],
+                        "$slice": -self.max_events,
+                    }
+                }
+            },
+        )
+        return True
+
+    def _trim(self):
+        excess = self.collection.estimated_document_count() - self.max_jobs
+        if excess > 0:
+            stale = self.collection.find({}, {"_id": 1}).sort("updated_at", 1).limit(excess)
+            self.collection.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+
+    def append_event(self, job_id: str, event_data: Any):
+        logger.info("Appending event for job %s: %s", job_id, event_data)
+        self._push_event(job_id, event_data, {}, upsert=True)
+
+    def create_job(
+        self,
+        job_id: str,
+        status: str,
+        owner: Optional[str] = None,
+        lease_seconds: int = 0,
+        **details,
+    ):
+        logger.info("Job %s created with status %s", job_id, status)
+        now = utc_now()
+        self.collection.replace_one(
+            {"_id": job_id},
+            {
+                "status": status,
+                "events": [],
+                "event_count": 0,
+                "result": "",
+                "details": details,
+                "created_at": now,
+                "updated_at": now,
+                "owner": owner,
+                "lease_expires_at": (
+                    now + timedelta(seconds=lease_seconds) if owner else None
+                ),
+            },
+            upsert=True,
+        )
+        self._push_event(job_id, status, {}, upsert=False)
+        self._trim()
+
+    def update_job(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        result: Optional[str] = None,
+        **details,
+    ):
+        updates = {f"details.{key}": value for key, value in details.items()}
+        if result is not None:
+            updates["result"] = result
+        if status and self._push_event(
+            job_id,
+            status,
+            {"status": status, **updates},
+            upsert=False,
+            condition={"status": {"$ne": status}},
+        ):
+            logger.info("Job %s -> %s", job_id, status)
+            return
+        self.collection.update_one(
+            {"_id": job_id}, {"$set": {"updated_at": utc_now(), **updates}}
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.collection.find_one({"_id": job_id})
+        if doc is None:
+            return None
+        doc.pop("_id")
+        return doc
+
+    def find_jobs(
+        self, statuses: Iterable[str], id_prefix: str = ""
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        query = {"status": {"$in": list(statuses)}}
+        if id_prefix:
+            query["_id"] = {"$regex": f"^{re.escape(id_prefix)}"}
+        return [
+            (doc.pop("_id"), doc)
+            for doc in self.collection.find(query).sort("created_at", 1)
+        ]
+
+    def claim_job(
+        self, job_id: str, statuses: Iterable[str], owner: str, lease_seconds: int
+    ) -> bool:
+        now = utc_now()
+        claimed = self.collection.find_one_and_update(
+            {
+                "_id": job_id,
+                "status": {"$in": list(statuses)},
+                # None also matches jobs created before leases existed
+                "$or": [
+                    {"lease_expires_at": None},
+                    {"lease_expires_at": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "owner": owner,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                }
+            },
+            projection={"_id": 1},
+        )
+        return claimed is not None
+
+    def renew_leases(
+        self, job_ids: Iterable[str], owner: str, lease_seconds: int
+    ) -> List[str]:
+        query = {"_id": {"$in": list(job_ids)}, "owner": owner}
+        self.collection.update_many(
+            query,
+            {"$set": {"lease_expires_at": utc_now() + timedelta(seconds=lease_seconds)}},
+        )
+        return self.collection.distinct("_id", query)
+
+
+def build_job_store() -> JobStore:
+    backend = os.getenv("JOB_STORE", "memory")
+    if backend == "mongo":
+        return MongoJobStore(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    return InMemoryJobStore()
+
+
+job_store = build_job_store()
+
+
+def append_event(job_id: str, event_data: Any):
+    job_store.append_event(job_id, event_data)
+
+
+def create_job(
+    job_id: str,
+    status: str,
+    owner: Optional[str] = None,
+    lease_seconds: int = 0,
+    **details,
+):
+    """
+    Create or replace a job. With an owner, the job starts leased to it for
+    lease_seconds; see claim_job and renew_leases.
+    """
+    job_store.create_job(
+        job_id, status, owner=owner, lease_seconds=lease_seconds, **details
+    )
+
+
+def update_job(
+    job_id: str, status: Optional[str] = None, result: Optional[str] = None, **details
+):
+    job_store.update_job(job_id, status=status, result=result, **details)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a snapshot of the job as a plain dict, or None if unknown."""
+    return job_store.get_job(job_id)
+
+
+def events_since(
+    job_id: str, after_seq: int
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    return job_store.events_since(job_id, after_seq)
+
+
+def find_jobs(
+    statuses: Iterable[str], id_prefix: str = ""
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Return (job_id, snapshot) for jobs in one of statuses whose ID starts with id_prefix."""
+    return job_store.find_jobs(statuses, id_prefix)
+
+
+def claim_job(
+    job_id: str, statuses: Iterable[str], owner: str, lease_seconds: int
+) -> bool:
+    return job_store.claim_job(job_id, statuses, owner, lease_seconds)
 
 
-def append_event(job_id: str, event_data: str):
-    with jobs_lock:
-        if job_id not in jobs:
-            logger.info("Job %s started", job_id)
-            jobs[job_id] = Job(status="STARTED", events=[], result="")
-        else:
-            logger.info("Appending event for job %s: %s", job_id, event_data)
-        jobs[job_id].events.append(Event(timestamp=datetime.now(), data=event_data))
+def renew_leases(job_ids: Iterable[str], owner: str, lease_seconds: int) -> List[str]:
+    return job_store.renew_leases(job_ids, owner, lease_seconds)
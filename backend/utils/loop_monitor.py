@@ -0,0 +1,62 @@
+import asyncio
+from collections import deque
+import time
+from typing import Dict, Optional
+
+from utils.log_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a fixed-interval sleep.
+
+    Any blocking call made from a coroutine shows up here as lag, since the
+    monitor cannot be scheduled until the blocking call returns.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120, warn_after: float = 0.2):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.warn_after:
+                logger.warning(f"Event loop blocked for {lag:.3f}s")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "last_ms": round(self.samples[-1] * 1000, 2),
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p99_ms": round(samples[int(0.99 * (len(samples) - 1))] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_lag_monitor = EventLoopLagMonitor()
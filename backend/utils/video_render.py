@@ -0,0 +1,21 @@
+import subprocess
+import time
+from typing import List
+
+
+def run_ffmpeg(command: List[str]) -> float:
+    """
+    Run an ffmpeg command to completion and return how long it took.
+
+    Kept free of app imports so it can be executed in a worker process.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg exited with code {completed.returncode}: "
+            f"{completed.stderr.decode(errors='replace')[-500:]}"
+        )
+    return time.perf_counter() - start
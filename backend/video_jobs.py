@@ -0,0 +1,262 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from db import create_video, get_album_by_id, video_fingerprint
+from utils.job_manager import (
+    append_event,
+    claim_job,
+    create_job,
+    find_jobs,
+    get_job,
+    renew_leases,
+    update_job,
+)
+from utils.log_config import setup_logger
+from utils.video_render import run_ffmpeg
+
+logger = setup_logger(__name__)
+
+VIDEO_RENDER_WORKERS = int(os.getenv("VIDEO_RENDER_WORKERS", 2))
+# Renders are leased to the process that queued them and the lease is renewed
+# every third of this; a render whose lease runs out may be taken over by
+# another process.
+VIDEO_JOB_LEASE_SECONDS = int(os.getenv("VIDEO_JOB_LEASE_SECONDS", 60))
+
+ACTIVE_STATUSES = ("QUEUED", "RENDERING")
+
+
+class VideoRenderQueue:
+    """
+    Queue of album video renders executed by a bounded worker process pool.
+
+    Only VIDEO_RENDER_WORKERS renders run at once, and a request matching a
+    queued or running render of the same album with the same images and
+    settings returns the existing job.
+    Job state (QUEUED -> RENDERING -> UPLOADED, or FAILED) and timings are
+    recorded through utils.job_manager, together with everything needed to
+    re-queue the render elsewhere. Each queued or running render is leased to
+    this process and the lease is kept alive by a heartbeat, so with a shared
+    job store another process only takes over renders whose owner has stopped.
+    """
+
+    def __init__(
+        self,
+        workers: int = VIDEO_RENDER_WORKERS,
+        lease_seconds: int = VIDEO_JOB_LEASE_SECONDS,
+    ):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Job IDs queued or running in this process whose lease it holds
+        self._owned: Set[str] = set()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # (album_id, video fingerprint) -> job ID of the queued or running render
+        self._active_renders: Dict[Tuple[str, str], str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"Started video render queue with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(
+        self,
+        album: dict,
+        settings: Dict[str, Any],
+        preview_settings: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Queue a render for the album and return its job ID."""
+        album_id = album["id"]
+        existing_job_id = self._active_renders.get(self._render_key(album, settings))
+        if existing_job_id:
+            job = await asyncio.to_thread(get_job, existing_job_id)
+            if job and job["status"] in ACTIVE_STATUSES:
+                logger.info(
+                    f"Video for album {album_id} already in progress as {existing_job_id}"
+                )
+                return existing_job_id
+
+        job_id = f"video-{uuid.uuid4()}"
+        await asyncio.to_thread(
+            create_job,
+            job_id,
+            "QUEUED",
+            album_id=album_id,
+            queue_depth=self.depth(),
+            settings=settings,
+            preview=preview_settings is not None,
+            preview_settings=preview_settings,
+            owner=self.owner,
+            lease_seconds=self.lease_seconds,
+        )
+        self._enqueue(job_id, album, settings, preview_settings)
+        return job_id
+
+    @staticmethod
+    def _render_key(album: dict, settings: Dict[str, Any]) -> Tuple[str, str]:
+        return album["id"], video_fingerprint(album, settings)
+
+    def _enqueue(
+        self,
+        job_id: str,
+        album: dict,
+        settings: Dict[str, Any],
+        preview_settings: Optional[Dict[str, Any]],
+    ):
+        self._owned.add(job_id)
+        self._active_renders[self._render_key(album, settings)] = job_id
+        self._queue.put_nowait(
+            (job_id, album, settings, preview_settings, time.perf_counter())
+        )
+
+    async def recover(self) -> int:
+        """
+        Take over renders left QUEUED or RENDERING by a process that stopped.
+
+        The queue itself only lives in memory, so without this such jobs would
+        never finish. Only jobs whose lease has expired are claimed, so renders
+        another live process is working on are left alone. Claimed renders
+        whose album no longer exists are marked FAILED.
+
+        :return: Number of renders re-queued
+        """
+        orphans = await asyncio.to_thread(find_jobs, ACTIVE_STATUSES, "video-")
+        requeued = 0
+        for job_id, job in orphans:
+            if job_id in self._owned:
+                continue
+            claimed = await asyncio.to_thread(
+                claim_job, job_id, ACTIVE_STATUSES, self.owner, self.lease_seconds
+            )
+            if not claimed:
+                continue
+            details = job.get("details", {})
+            try:
+                album = await get_album_by_id(details["album_id"])
+            except Exception as e:
+                logger.error(f"Could not load album for orphaned video job {job_id}: {str(e)}")
+                album = None
+            if not album or "settings" not in details:
+                await asyncio.to_thread(
+                    update_job,
+                    job_id,
+                    status="FAILED",
+                    result="Render lost with its worker",
+                )
+                continue
+            await asyncio.to_thread(append_event, job_id, f"Taken over by {self.owner}")
+            await asyncio.to_thread(update_job, job_id, status="QUEUED")
+            self._enqueue(job_id, album, details["settings"], details.get("preview_settings"))
+            requeued += 1
+        if requeued:
+            logger.info(f"Re-queued {requeued} orphaned video jobs")
+        return requeued
+
+    async def _heartbeat(self):
+        """Renew the leases of this process's renders and take over expired ones."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if self._owned:
+                    owned = set(self._owned)
+                    held = await asyncio.to_thread(
+                        renew_leases, owned, self.owner, self.lease_seconds
+                    )
+                    for job_id in owned - set(held):
+                        # Taken over after a missed renewal; a queued copy is
+                        # dropped by the worker, a running render can't be stopped
+                        logger.warning(f"Lost the lease on video job {job_id}")
+                        self._owned.discard(job_id)
+                await self.recover()
+            except Exception as e:
+                logger.error(f"Video job heartbeat failed: {str(e)}")
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _render(self, command: List[str]) -> float:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run_ffmpeg, command)
+
+    async def _worker(self):
+        while True:
+            job_id, album, settings, preview_settings, queued_at = await self._queue.get()
+            if job_id not in self._owned:
+                logger.info(f"Skipping video job {job_id}, another process took it over")
+                self._forget(job_id, album, settings)
+                self._queue.task_done()
+                continue
+            started_at = time.perf_counter()
+            await asyncio.to_thread(
+                update_job,
+                job_id,
+                status="RENDERING",
+                queued_seconds=round(started_at - queued_at, 3),
+            )
+
+            async def on_stage(stage: str, timings: Dict[str, float]):
+                await asyncio.to_thread(update_job, job_id, stage=stage, **timings)
+
+            try:
+                s3_url = await create_video(
+                    album,
+                    settings=settings,
+                    preview_settings=preview_settings,
+                    render=self._render,
+                    on_stage=on_stage,
+                )
+                await asyncio.to_thread(
+                    update_job,
+                    job_id,
+                    status="UPLOADED",
+                    result=s3_url,
+                    total_seconds=round(time.perf_counter() - started_at, 3),
+                )
+            except asyncio.CancelledError:
+                await asyncio.to_thread(
+                    update_job, job_id, status="FAILED", result="Render cancelled"
+                )
+                raise
+            except Exception as e:
+                await asyncio.to_thread(
+                    update_job,
+                    job_id,
+                    status="FAILED",
+                    result=str(e),
+                    total_seconds=round(time.perf_counter() - started_at, 3),
+                )
+            finally:
+                self._owned.discard(job_id)
+                self._forget(job_id, album, settings)
+                self._queue.task_done()
+
+    def _forget(self, job_id: str, album: dict, settings: Dict[str, Any]):
+        render_key = self._render_key(album, settings)
+        if self._active_renders.get(render_key) == job_id:
+            del self._active_renders[render_key]
+
+
+video_render_queue = VideoRenderQueue()
@@ -0,0 +1,17 @@
+import { buildApiUrl } from '@/app/lib/config';
+import { NextResponse } from 'next/server';
+
+export async function GET(req: Request, { params }: { params: { id: string } }) {
+  const { id } = params;
+
+  try {
+    const response = await fetch(buildApiUrl(`/album-jobs/${id}`), {
+      cache: 'no-store',
+    });
+
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    return NextResponse.json({ error: 'Failed to fetch album job' }, { status: 500 });
+  }
+}
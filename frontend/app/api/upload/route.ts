@@ -46,10 +46,6 @@ export async function POST(request: NextRequest) {
 
     const result = await response.json()
 
-    if (!result.image_id) {
-      throw new Error('No image ID received from server')
-    }
-
     // Clean up temporary file
     try {
       await unlink(filepath)
@@ -57,10 +53,17 @@ export async function POST(request: NextRequest) {
       console.error('Error deleting temporary file:', error)
     }
 
+    // A near-duplicate dropped by the "skip" policy has no image ID of its own
+    if (!result.image_id && !result.skipped) {
+      throw new Error('No image ID received from server')
+    }
+
     return NextResponse.json({
       imageId: result.image_id,
       s3Url: result.s3_url,
-      crewResult: result.crew_result
+      crewResult: result.crew_result,
+      skipped: Boolean(result.skipped),
+      duplicateOf: result.duplicate_of?.image_id ?? null
     })
 
   } catch (error) {
@@ -15,6 +15,26 @@ export async function uploadPhoto(formData: FormData) {
 }
 
 
+const ALBUM_JOB_POLL_INTERVAL_MS = 1000;
+
+async function waitForAlbumJob(jobId: string): Promise<any> {
+  while (true) {
+    const response = await fetch(`/api/album-jobs/${jobId}`, { cache: 'no-store' });
+    if (!response.ok) {
+      throw new Error(`Failed to fetch album job: ${response.status}`);
+    }
+
+    const job = await response.json();
+    if (job.status === 'COMPLETED') {
+      return job.album;
+    }
+    if (job.status === 'FAILED') {
+      throw new Error(`Failed to generate album: ${job.result}`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, ALBUM_JOB_POLL_INTERVAL_MS));
+  }
+}
+
 export async function generateAlbum(input: FormData | { theme: string }): Promise<Album> {
 
   let formData: FormData;
@@ -38,7 +58,9 @@ export async function generateAlbum(input: FormData | { theme: string }): Promis
     throw new Error(`Failed to generate album: ${response.status} ${errorText}`);
   }
 
-  const data = await response.json();
+  // The backend queues the generation and returns a job id to poll
+  const { job_id } = await response.json();
+  const data = await waitForAlbumJob(job_id);
   
   // Ensure the response contains the expected fields
   if (!data.id || !data.album_name || !data.description || !Array.isArray(data.images) || !data.createdAt) {